@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Реестр приложений: команда из config.APPS -> полный путь к .exe.
+
+Пути ищутся один раз при старте: явный путь из APPS, PATH (shutil.which),
+раздел реестра Windows «App Paths» (там живут chrome/msedge, которые находил start)
+и папки из config.APP_SEARCH_DIRS. Результат кэшируется в data/app_paths.json;
+запись сбрасывается, если файл пропал или изменился (mtime/размер), а весь кэш —
+если поменялись PATH или APP_SEARCH_DIRS.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from config import APP_PATHS_CACHE, APP_SEARCH_DIRS, APPS
+
+try:
+    import winreg
+except ImportError:  # не Windows
+    winreg = None
+
+_APP_PATHS_KEY = r"SOFTWARE\Microsoft\Windows\CurrentVersion\App Paths"
+
+
+def is_uri(cmd: str) -> bool:
+    """ms-settings:, http:// и т.п. — открываются оболочкой, путь не нужен."""
+    return cmd.startswith("ms-") or "://" in cmd
+
+
+def _stat_key(path: str) -> list | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _env_fingerprint() -> str:
+    # Появление программы в папке меняет её mtime — тогда ненайденные ищутся заново
+    dirs = [f"{d}:{_stat_key(os.path.expandvars(d))}" for d in APP_SEARCH_DIRS]
+    raw = os.environ.get("PATH", "") + "|" + "|".join(dirs)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _from_app_paths(cmd: str) -> str | None:
+    if winreg is None:
+        return None
+    name = cmd if cmd.lower().endswith(".exe") else cmd + ".exe"
+    for hive in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+        try:
+            with winreg.OpenKey(hive, _APP_PATHS_KEY + "\\" + name) as key:
+                value, _ = winreg.QueryValueEx(key, None)
+        except OSError:
+            continue
+        value = os.path.expandvars(value.strip('"'))
+        if os.path.isfile(value):
+            return value
+    return None
+
+
+def _from_search_dirs(cmd: str) -> str | None:
+    names = [cmd] if cmd.lower().endswith(".exe") else [cmd + ".exe", cmd]
+    for d in APP_SEARCH_DIRS:
+        base = Path(os.path.expandvars(d))
+        for n in names:
+            p = base / n
+            if p.is_file():
+                return str(p)
+    return None
+
+
+def find_executable(cmd: str) -> str | None:
+    """Ищет полный путь к команде без кэша. None — не нашли (или это URI)."""
+    if not cmd or is_uri(cmd):
+        return None
+    expanded = os.path.expandvars(cmd)
+    if os.path.isabs(expanded):
+        return expanded if os.path.isfile(expanded) else None
+    return shutil.which(cmd) or _from_app_paths(cmd) or _from_search_dirs(cmd)
+
+
+class AppRegistry:
+    """Команды приложений с заранее найденными путями и кэшем на диске."""
+
+    def __init__(self, apps: dict[str, str] | None = None, cache_path: str | None = None):
+        self.apps = dict(APPS if apps is None else apps)
+        self.cache_path = Path(cache_path or APP_PATHS_CACHE)
+        self._lock = threading.Lock()
+        self._paths: dict[str, str | None] = {}
+
+    def _read_cache(self) -> dict:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("env") != _env_fingerprint():
+            return {}
+        return data.get("entries", {})
+
+    def _write_cache(self, entries: dict) -> None:
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"env": _env_fingerprint(), "entries": entries}, f, ensure_ascii=False, indent=2)
+        except OSError:
+            pass  # кэш — только ускорение
+
+    def load(self) -> list[str]:
+        """
+        Находит пути ко всем командам (из кэша, если он ещё верен).
+        Возвращает псевдонимы из APPS, для которых программа не найдена.
+        """
+        cached = self._read_cache()
+        entries, paths = {}, {}
+        for cmd in set(self.apps.values()):
+            if is_uri(cmd):
+                continue
+            entry = cached.get(cmd)
+            path = entry.get("path") if entry else None
+            if entry is None or (path is not None and _stat_key(path) != entry.get("stat")):
+                path = find_executable(cmd)
+            paths[cmd] = path
+            entries[cmd] = {"path": path, "stat": _stat_key(path) if path else None}
+        if entries != cached:
+            self._write_cache(entries)
+        with self._lock:
+            self._paths = paths
+        return sorted(alias for alias, cmd in self.apps.items() if not is_uri(cmd) and paths.get(cmd) is None)
+
+    def resolve(self, cmd: str) -> str | None:
+        """Полный путь к команде. Для команд не из APPS ищет и запоминает на лету."""
+        if is_uri(cmd):
+            return None
+        with self._lock:
+            if cmd in self._paths:
+                return self._paths[cmd]
+        path = find_executable(cmd)
+        with self._lock:
+            self._paths[cmd] = path
+        return path
+
+    def is_available(self, alias: str) -> bool:
+        """Есть ли чем открыть приложение alias (URI считаются доступными)."""
+        cmd = self.apps.get(alias)
+        if not cmd:
+            return False
+        return is_uri(cmd) or self.resolve(cmd) is not None
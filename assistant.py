@@ -4,13 +4,28 @@
 """
 
 import json
+import os
 import random
+import threading
 from datetime import datetime
 from pathlib import Path
 
+import metrics
+from llm_client import Conversation, get_client
 from neural.intents_model import IntentPredictor
-from pc_controller import open_app, search_in_browser
-from config import INTENTS_FILE, APPS, LLM_ENABLED, LLM_MODEL, LLM_MAX_LENGTH
+from neural.reply_model import ReplyPredictor
+from pc_controller import OnDone, open_app, search_in_browser
+from config import (
+    INTENTS_FILE,
+    APPS,
+    LLM_ENABLED,
+    LLM_MAX_LENGTH,
+    REPLY_LOG_BACKUP_PATH,
+    REPLY_LOG_ENABLED,
+    REPLY_LOG_MAX_BYTES,
+    REPLY_LOG_PATH,
+    REPLY_RANKER_ENABLED,
+)
 
 
 # Команды поиска: если фраза НАЧИНАЕТСЯ с одного из них — это всегда поиск (мимо нейросети)
@@ -51,6 +66,29 @@ FOLLOW_UP_PREFIXES = ("а теперь ", "теперь ", "и ещё ", "ещё
 FOLLOW_UP_BLOCKLIST = frozenset(("что", "как", "это", "всё", "так", "да", "нет", "хорошо", "понятно", "ладно", "окей"))
 
 
+# Ответы этих тегов — шаблон с подстановкой из конечного набора (%app% — ключи config.APPS):
+# они повторяются, и их стоит сохранять в кэш озвучки (voice_output.speak(remember=True)).
+# Поиск (%query% — свободный текст), время, дата и ответы LLM каждый раз новые — их не кэшируем.
+CACHED_SPEECH_TAGS = frozenset(("открыть_приложение",))
+
+
+# Системный промпт неизменен — Ollama кэширует его обработку между ходами.
+# Тема (тег намерения) идёт коротким хвостом в реплике пользователя.
+SYSTEM_PROMPT = (
+    "Ты VegraAI — голосовой помощник в стиле Джарвиса. Отвечай на русском, кратко (1–4 предложения), по-человечески. "
+    "Можешь шутить, подбадривать, давать советы. Не говори «я нейросеть/программа», если не спросят. "
+    "Стиль: дружелюбный, умный, с лёгким юмором. "
+    "В конце реплики пользователя в квадратных скобках указана тема разговора — учитывай её, но не повторяй."
+)
+
+# Разговор по умолчанию (консоль и GUI — один собеседник)
+_conversation = Conversation(SYSTEM_PROMPT)
+
+# Локальные ответы из банка (если собран) и журнал ответов LLM для его сборки
+_reply_predictor = ReplyPredictor()
+_reply_log_lock = threading.Lock()
+
+
 def _load_intents() -> dict:
     with open(INTENTS_FILE, "r", encoding="utf-8") as f:
         return json.load(f)
@@ -91,35 +129,65 @@ def _is_implicit_search(text: str) -> bool:
     return any(t.startswith(p) for p in IMPLICIT_SEARCH_PREFIXES)
 
 
-def _llm_reply(user_text: str, intent_tag: str) -> str | None:
-    """Ответ от LLM (Ollama). None при отключении/ошибке — тогда шаблон."""
+def _user_content(user_text: str, intent_tag: str) -> str:
+    """Реплика пользователя в том виде, в каком она уходит в LLM и хранится в истории."""
+    return f"{user_text.strip()} [{intent_tag.replace('_', ' ')}]"
+
+
+@metrics.timed("llm")
+def _llm_reply(user_text: str, intent_tag: str, conversation: Conversation | None = None, on_partial=None) -> str | None:
+    """
+    Ответ от LLM (Ollama) с учётом истории разговора. None при отключении/ошибке — тогда шаблон.
+    on_partial(текст_пока) — получать ответ по мере генерации (для GUI).
+    """
     if not LLM_ENABLED:
         return None
-    system = (
-        "Ты VegraAI — голосовой помощник в стиле Джарвиса. Отвечай на русском, кратко (1–4 предложения), по-человечески. "
-        "Можешь шутить, подбадривать, давать советы. Не говори «я нейросеть/программа», если не спросят. "
-        "Стиль: дружелюбный, умный, с лёгким юмором. Контекст: " + intent_tag.replace("_", " ") + "."
-    )
-    try:
-        from ollama import chat
-
-        r = chat(
-            model=LLM_MODEL,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user_text},
-            ],
-        )
-        content = (r.message.content or "").strip()
+    conv = conversation or _conversation
+    user_content = _user_content(user_text, intent_tag)
+    # Клиент держит соединение и модель в памяти; таймаут/ошибка -> None -> шаблон.
+    # Ход целиком под turn_lock: параллельный ход ждёт и увидит историю уже с этим.
+    with conv.turn_lock:
+        content = get_client().chat(conv.messages(user_content), on_partial=on_partial)
         if not content:
             return None
-        if len(content) > LLM_MAX_LENGTH:
-            cut = content[: LLM_MAX_LENGTH + 1]
-            last = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "), cut.rfind("\n"))
-            content = cut[: last + 1].strip() if last > LLM_MAX_LENGTH // 2 else cut[:LLM_MAX_LENGTH].rstrip(" .,!?") + "."
-        return content
+        conv.add_turn(user_content, content)
+    if len(content) > LLM_MAX_LENGTH:
+        cut = content[: LLM_MAX_LENGTH + 1]
+        last = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "), cut.rfind("\n"))
+        content = cut[: last + 1].strip() if last > LLM_MAX_LENGTH // 2 else cut[:LLM_MAX_LENGTH].rstrip(" .,!?") + "."
+    return content
+
+
+def _local_reply(user_text: str, intent_tag: str) -> str | None:
+    """Ответ из банка ответов (neural/reply_model.py). None — банка нет или ранжировщик не уверен."""
+    if not REPLY_RANKER_ENABLED or not _reply_predictor.available():
+        return None
+    try:
+        reply = _reply_predictor.reply(user_text, intent_tag)
     except Exception:
         return None
+    if reply:
+        metrics.inc("reply_local_hits")
+    return reply
+
+
+def _log_llm_reply(user_text: str, intent_tag: str, reply: str) -> None:
+    """
+    Дописывает тройку (фраза, тег, ответ LLM) в журнал для python neural/train_replies.py.
+    Журнал больше REPLY_LOG_MAX_BYTES переносится в REPLY_LOG_BACKUP_PATH (прошлая копия
+    затирается), так что на диске не больше двух частей.
+    """
+    if not REPLY_LOG_ENABLED:
+        return
+    line = json.dumps({"text": user_text.strip(), "tag": intent_tag, "reply": reply}, ensure_ascii=False)
+    try:
+        with _reply_log_lock:
+            if os.path.exists(REPLY_LOG_PATH) and os.path.getsize(REPLY_LOG_PATH) >= REPLY_LOG_MAX_BYTES:
+                os.replace(REPLY_LOG_PATH, REPLY_LOG_BACKUP_PATH)
+            with open(REPLY_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError:
+        pass
 
 
 def _get_follow_up_search_query(text: str, last_intent: str | None) -> str | None:
@@ -135,33 +203,63 @@ def _get_follow_up_search_query(text: str, last_intent: str | None) -> str | Non
     return None
 
 
-def process(text: str, predictor: IntentPredictor | None = None, last_intent: str | None = None) -> tuple[str, bool, str | None]:
+def _report_failure(on_action_error, message: str) -> OnDone | None:
+    """Колбэк для фонового запуска: при неудаче передаёт готовую фразу в on_action_error."""
+    if on_action_error is None:
+        return None
+
+    def on_done(cmd: str, ok: bool) -> None:
+        if not ok:
+            on_action_error(message)
+
+    return on_done
+
+
+def route(text: str, last_intent: str | None = None) -> tuple[str | None, str | None]:
+    """
+    Жёсткий фильтр по префиксам, до нейросети.
+    Возвращает (тег, запрос_поиска) или (None, None), если фразу надо отдать нейросети.
+    """
+    # 1) Продолжение поиска: «а теперь смартфон», «теперь X», «ещё X» после прошлого поиска
+    if (q := _get_follow_up_search_query(text, last_intent)) is not None:
+        return "поиск_в_интернете", q
+    # 2) Неявный поиск: «как сделать мясо», «рецепт борща» — без «найди/поищи»
+    if _is_implicit_search(text):
+        return "поиск_в_интернете", text.strip()
+    # 3) Явные команды поиска: «найди», «поищи», «загугли» …
+    if _is_search_command(text):
+        return "поиск_в_интернете", None
+    # 4) «Открой / запусти / включи»
+    if _is_open_app_command(text):
+        return "открыть_приложение", None
+    return None, None
+
+
+@metrics.timed("turn")
+def process(
+    text: str,
+    predictor: IntentPredictor | None = None,
+    last_intent: str | None = None,
+    conversation: Conversation | None = None,
+    on_partial=None,
+    on_action_error=None,
+) -> tuple[str, bool, str | None]:
     """
     Обрабатывает фразу: жёсткий фильтр (продолжение поиска, неявный поиск, явный поиск, открыть),
     потом нейросеть (поболтать, время, дата и т.п.). Возвращает (ответ, выйти?, тег_намерения).
+    conversation — история для LLM (по умолчанию общая на процесс).
+    on_partial — колбэк для ответа LLM по мере генерации.
+    on_action_error(фраза) — вызывается из фонового потока, если приложение или браузер
+    так и не открылись (ответ «Открываю …» к этому моменту уже отдан).
     """
     if predictor is None:
         predictor = IntentPredictor()
     intents_data = _load_intents()
-    t = text.strip().lower()
-    search_query_override: str | None = None
 
-    # 1) Продолжение поиска: «а теперь смартфон», «теперь X», «ещё X» после прошлого поиска
-    if (q := _get_follow_up_search_query(text, last_intent)) is not None:
-        tag = "поиск_в_интернете"
-        search_query_override = q
-    # 2) Неявный поиск: «как сделать мясо», «рецепт борща» — без «найди/поищи»
-    elif _is_implicit_search(text):
-        tag = "поиск_в_интернете"
-        search_query_override = text.strip()
-    # 3) Явные команды поиска: «найди», «поищи», «загугли» …
-    elif _is_search_command(text):
-        tag = "поиск_в_интернете"
-    # 4) «Открой / запусти / включи»
-    elif _is_open_app_command(text):
-        tag = "открыть_приложение"
-    # 5) Всё остальное — нейросеть
-    else:
+    with metrics.span("routing"):
+        tag, search_query_override = route(text, last_intent)
+    # Фильтр не сработал — решает нейросеть
+    if tag is None:
         tag = predictor.predict(text)
 
     intent = next((i for i in intents_data["intents"] if i["tag"] == tag), None)
@@ -177,17 +275,20 @@ def process(text: str, predictor: IntentPredictor | None = None, last_intent: st
         app_key = _extract_app_name(text)
         if not app_key:
             return "Не понял, какое приложение открыть. Назови, например: блокнот, калькулятор, браузер.", False, tag
-        ok = open_app(app_key)
+        failed = f"Не получилось открыть {app_key}. Проверь название в config.APPS."
+        # Запуск идёт в фоне — ответ не ждёт создания процесса, неудача придёт в on_action_error
+        ok = open_app(app_key, _report_failure(on_action_error, failed))
         rep = random.choice(responses).replace("%app%", app_key)
-        return rep if ok else f"Не получилось открыть {app_key}. Проверь название в config.APPS.", False, tag
+        return rep if ok else failed, False, tag
 
     if tag == "поиск_в_интернете":
         query = search_query_override if search_query_override is not None else _extract_search_query(text)
         if not query:
             return "Уточни, что искать в интернете.", False, tag
-        ok = search_in_browser(query)
+        failed = "Не удалось открыть браузер."
+        ok = search_in_browser(query, _report_failure(on_action_error, failed))
         rep = random.choice(responses).replace("%query%", query)
-        return rep if ok else "Не удалось открыть браузер.", False, tag
+        return rep if ok else failed, False, tag
 
     if tag == "текущее_время":
         time_str = datetime.now().strftime("%H:%M")
@@ -200,9 +301,17 @@ def process(text: str, predictor: IntentPredictor | None = None, last_intent: st
         date_str = f"{weekday}, {d.day} {months[d.month-1]} {d.year}"
         return random.choice(responses).replace("%date%", date_str), False, tag
 
-    # Разговоры: ответ от нейросети (Ollama), иначе — шаблон
+    # Разговоры: знакомое — из банка ответов, новое — от LLM (Ollama), иначе — шаблон.
+    # Банк заменяет LLM, поэтому без LLM_ENABLED отвечают только шаблоны.
+    conv = conversation or _conversation
+    reply = None
     if LLM_ENABLED:
-        llm = _llm_reply(text, tag)
-        if llm:
-            return llm, should_exit, tag
-    return random.choice(responses), should_exit, tag
+        if reply := _local_reply(text, tag):
+            # В историю — как ответ LLM, чтобы следующий ход видел разговор целиком
+            with conv.turn_lock:
+                conv.add_turn(_user_content(text, tag), reply)
+        elif reply := _llm_reply(text, tag, conv, on_partial):
+            _log_llm_reply(text, tag, reply)
+    if should_exit:
+        conv.clear()
+    return reply or random.choice(responses), should_exit, tag
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарки горячих путей ассистента с сохранёнными базовыми результатами.
+
+Корпус синтетический: фразы из data/intents.json плюс искажённые варианты
+(опечатки, перестановки, лишние слова). Замеряются:
+    tokenize, route (жёсткий фильтр из assistant.process), predict (по одной фразе),
+    predict_batch, cold_load (загрузка модели), llm_reply (через заглушку Ollama).
+
+Запуск:
+    python bench.py                      — замер и сравнение с базой
+    python bench.py --save-baseline      — записать текущие результаты как базу
+    python bench.py --threshold 0.3      — допустимое замедление (по умолчанию 20%)
+    python bench.py --only tokenize,route
+Код выхода 1, если какой-то бенчмарк медленнее базы больше порога.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+
+from config import INTENTS_FILE, MODEL_PATH
+
+BASELINE_PATH = "data/bench_baseline.json"
+DEFAULT_THRESHOLD = 0.2
+FILLERS = ("пожалуйста", "слушай", "ну", "а", "скажи", "вегра")
+
+
+# ============ Корпус ============
+
+def _typo(word: str, rng: random.Random) -> str:
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2 :]
+
+
+def perturb(text: str, rng: random.Random) -> str:
+    """Случайное искажение фразы: опечатка, перестановка слов, лишнее слово, регистр."""
+    words = text.split()
+    kind = rng.randrange(4)
+    if kind == 0 and words:
+        i = rng.randrange(len(words))
+        words[i] = _typo(words[i], rng)
+    elif kind == 1 and len(words) > 1:
+        i = rng.randrange(len(words) - 1)
+        words[i], words[i + 1] = words[i + 1], words[i]
+    elif kind == 2:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(FILLERS))
+    else:
+        return text.capitalize() + rng.choice(("?", "!", "..."))
+    return " ".join(words)
+
+
+def build_corpus(variants: int = 2, seed: int = 0) -> list[str]:
+    """Все паттерны из intents.json и по variants искажённых копий каждого."""
+    with open(ROOT / INTENTS_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    rng = random.Random(seed)
+    corpus = []
+    for item in data["intents"]:
+        for p in item["patterns"]:
+            corpus.append(p)
+            corpus.extend(perturb(p, rng) for _ in range(variants))
+    return corpus
+
+
+# ============ Замер ============
+
+def measure(fn, ops: int, repeat: int = 5, warmup: int = 1) -> dict:
+    """fn() выполняет ops операций; возвращает время на операцию (мс) по раундам."""
+    for _ in range(warmup):
+        fn()
+    rounds = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        rounds.append((time.perf_counter() - t0) * 1000 / ops)
+    return {"ops": ops, "median_ms": statistics.median(rounds), "min_ms": min(rounds), "max_ms": max(rounds)}
+
+
+class Skip(Exception):
+    """Бенчмарк нельзя выполнить в этом окружении (нет модели, torch, ollama)."""
+
+
+def _need_model():
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        raise Skip("не установлен torch")
+    if not (ROOT / MODEL_PATH).exists():
+        raise Skip("модель не обучена")
+
+
+def bench_tokenize(corpus, repeat):
+    from neural.intents_model import tokenize
+
+    return measure(lambda: [tokenize(t) for t in corpus], len(corpus), repeat)
+
+
+def bench_route(corpus, repeat):
+    from assistant import route
+
+    return measure(lambda: [route(t, "поиск_в_интернете") for t in corpus], len(corpus), repeat)
+
+
+def bench_predict(corpus, repeat):
+    _need_model()
+    from neural.intents_model import IntentPredictor
+
+    p = IntentPredictor()
+    p._ensure_loaded()
+    return measure(lambda: [p.predict(t) for t in corpus], len(corpus), repeat)
+
+
+def bench_predict_batch(corpus, repeat, batch_size: int = 32):
+    _need_model()
+    from neural.intents_model import IntentPredictor
+
+    p = IntentPredictor()
+    p._ensure_loaded()
+    batches = [corpus[i : i + batch_size] for i in range(0, len(corpus), batch_size)]
+    return measure(lambda: [p.predict_batch(b) for b in batches], len(corpus), repeat)
+
+
+def bench_cold_load(corpus, repeat):
+    _need_model()
+    from neural.intents_model import IntentPredictor
+
+    return measure(lambda: IntentPredictor()._ensure_loaded(), 1, repeat)
+
+
+def bench_llm_reply(corpus, repeat, n: int = 20):
+    import ollama  # noqa: F401 — без него бенчмарк не в счёт
+    import assistant
+    import llm_client
+    from ollama_stub import OllamaStub
+
+    if not assistant.LLM_ENABLED:
+        raise Skip("LLM_ENABLED = False")
+    sample = corpus[:n]
+    with OllamaStub() as stub:
+        original = llm_client.get_client()
+        llm_client.set_client(llm_client.LLMClient(host=stub.url))
+        conv = llm_client.Conversation(assistant.SYSTEM_PROMPT, max_tokens=0)  # без истории — каждый ход одинаков
+        try:
+            res = measure(lambda: [assistant._llm_reply(t, "общий_разговор", conv) for t in sample], len(sample), repeat)
+        finally:
+            llm_client.set_client(original)
+        if not stub.requests:
+            raise Skip("запросы не дошли до заглушки Ollama")
+        return res
+
+
+BENCHMARKS = {
+    "tokenize": bench_tokenize,
+    "route": bench_route,
+    "predict": bench_predict,
+    "predict_batch": bench_predict_batch,
+    "cold_load": bench_cold_load,
+    "llm_reply": bench_llm_reply,
+}
+
+
+def run(names: list[str], repeat: int = 5, seed: int = 0) -> dict:
+    corpus = build_corpus(seed=seed)
+    print(f"Корпус: {len(corpus)} фраз")
+    results = {}
+    for name in names:
+        try:
+            r = BENCHMARKS[name](corpus, repeat)
+        except (Skip, ImportError) as e:
+            # Нет зависимостей (torch, ollama) или модели — бенчмарк не в счёт
+            print(f"{name:<15} пропущен: {e}")
+            continue
+        results[name] = r
+        print(f"{name:<15} {r['median_ms'] * 1000:>10.1f} мкс/оп  (min {r['min_ms'] * 1000:.1f}, n={r['ops']})")
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Имена бенчмарков, замедлившихся больше чем на threshold относительно базы."""
+    regressed = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = r["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+        mark = "РЕГРЕССИЯ" if ratio > 1 + threshold else "ок"
+        print(f"{name:<15} {ratio:>6.2f}x от базы  {mark}")
+        if ratio > 1 + threshold:
+            regressed.append(name)
+    return regressed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Бенчмарки VegraAI")
+    ap.add_argument("--only", default="", help="через запятую: " + ",".join(BENCHMARKS))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="допустимое замедление, доля (0.2 = 20%%)")
+    ap.add_argument("--baseline", default=str(ROOT / BASELINE_PATH))
+    ap.add_argument("--save-baseline", action="store_true")
+    args = ap.parse_args()
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()] or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        ap.error(f"неизвестные бенчмарки: {', '.join(unknown)}")
+
+    results = run(names, repeat=args.repeat)
+    baseline_path = Path(args.baseline)
+
+    if args.save_baseline:
+        saved = {}
+        if baseline_path.exists():
+            with open(baseline_path, "r", encoding="utf-8") as f:
+                saved = json.load(f).get("results", {})
+        saved.update(results)
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(), "results": saved}, f, indent=2)
+        print(f"База сохранена: {baseline_path}")
+        return
+
+    if not baseline_path.exists():
+        print("Базы нет — сохрани её: python bench.py --save-baseline")
+        return
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f).get("results", {})
+    print()
+    regressed = compare(results, baseline, args.threshold)
+    if regressed:
+        print(f"\nМедленнее базы больше чем на {args.threshold:.0%}: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
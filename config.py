@@ -34,6 +34,17 @@ APPS = {
 # Если Chrome/Edge установлены не по умолчанию — укажи полный путь, например:
 # "chrome": r"C:\Program Files\Google\Chrome\Application\chrome.exe",
 
+# Где ещё искать .exe, если программы нет в PATH и в реестре «App Paths»
+APP_SEARCH_DIRS = [
+    r"%ProgramFiles%\Google\Chrome\Application",
+    r"%ProgramFiles(x86)%\Google\Chrome\Application",
+    r"%LocalAppData%\Google\Chrome\Application",
+    r"%ProgramFiles(x86)%\Microsoft\Edge\Application",
+    r"%ProgramFiles%\Mozilla Firefox",
+]
+# Кэш найденных путей (пересобирается сам, если файлы или PATH изменились)
+APP_PATHS_CACHE = "data/app_paths.json"
+
 # ============ Поиск в интернете ============
 # Какую поисковую систему использовать
 SEARCH_URL = "https://www.google.com/search?q={query}"
@@ -50,6 +61,12 @@ VOICE_INDEX = 0
 SPEECH_RATE = 150   # Скорость речи (слов в минуту)
 VOLUME = 1.0        # Громкость 0.0–1.0
 
+# Кэш озвучки: шаблонные ответы синтезируются один раз и потом играются из WAV
+TTS_CACHE_ENABLED = True
+TTS_CACHE_DIR = "data/tts_cache"
+TTS_CACHE_DYNAMIC_MAX = 200   # сколько фраз с подстановками (%app% и т.п.) хранить
+TTS_CACHE_MAX_CHARS = 120     # фразы длиннее (обычно ответы LLM) не кэшируются
+
 # ============ LLM (Ollama) — ответы нейросетью, не шаблонами ============
 # 1) Установи Ollama: https://ollama.com
 # 2) Скачай модель (одну на выбор):
@@ -62,3 +79,28 @@ VOLUME = 1.0        # Громкость 0.0–1.0
 LLM_ENABLED = True
 LLM_MODEL = "qwen2.5:3b"   # или: deepseek-r1:7b-qwen-distill-q4_K_M, deepseek-r1:14b-qwen-distill-q4_K_M, llama3.2
 LLM_MAX_LENGTH = 600       # макс. длина ответа для озвучки
+LLM_HOST = None            # None — OLLAMA_HOST или http://localhost:11434
+LLM_TIMEOUT = 30           # секунд на запрос; дольше — ответ по шаблону
+LLM_KEEP_ALIVE = "30m"     # сколько Ollama держит модель в памяти после запроса (-1 — всегда)
+LLM_WARMUP = True          # загрузить модель в фоне при старте, чтобы первый ответ был быстрым
+LLM_HISTORY_TOKENS = 1500  # сколько токенов прошлых реплик помнить в разговоре (0 — без памяти)
+
+# ============ Локальные ответы вместо LLM (neural/reply_model.py) ============
+# Ответы LLM пишутся в журнал; python neural/train_replies.py собирает из них
+# банк ответов и ранжировщик. Уверенные случаи отвечаются локально, новые — LLM.
+REPLY_LOG_ENABLED = True
+REPLY_LOG_PATH = "data/llm_replies.jsonl"
+REPLY_LOG_MAX_BYTES = 5_000_000                  # больше — журнал уходит в REPLY_LOG_BACKUP_PATH
+REPLY_LOG_BACKUP_PATH = "data/llm_replies.1.jsonl"  # одна прошлая часть, старее — удаляется
+REPLY_BANK_PATH = "data/reply_bank.json"
+REPLY_MODEL_PATH = "data/reply_ranker.pt"
+REPLY_RANKER_ENABLED = True   # работает, только если банк собран
+REPLY_MIN_CONFIDENCE = 0.6    # ниже — спрашиваем LLM (выбрать по python neural/train_replies.py --eval)
+REPLY_MIN_KNOWN = 0.5         # доля знакомых банку слов во фразе, иначе фраза «новая»
+
+# ============ Замеры задержек (metrics.py) ============
+# Тайминги этапов: запись, распознавание, фильтр, нейросеть, LLM, действие, озвучка.
+# Сводка по файлу: python metrics.py data/metrics.jsonl
+METRICS_ENABLED = False
+METRICS_JSONL_PATH = "data/metrics.jsonl"   # None — не писать в файл
+METRICS_PROMETHEUS_PORT = None               # например 9108 — http://127.0.0.1:9108/metrics
@@ -2,8 +2,16 @@
 """
 Графическое приложение VegraAI: чат, переключатель Вкл/Выкл голоса.
 Запуск: python gui_app.py
+
+Рабочие потоки не трогают Tk напрямую: они кладут события в очередь (post),
+а UI раз в UI_TICK_MS забирает всё накопленное и применяет одной пачкой —
+одна прокрутка чата на тик, из потока частичных ответов LLM — только последний.
+У каждого хода свой номер: частичные ответы и итоговый ответ хода попадают
+в его собственный пузырь, даже если ходы идут одновременно.
 """
 
+import itertools
+import queue
 import sys
 import threading
 from pathlib import Path
@@ -14,11 +22,18 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 import customtkinter as ctk
+import metrics
 from voice_input import listen_once
 from voice_output import speak
-from assistant import process
+from assistant import CACHED_SPEECH_TAGS, process
 from neural.intents_model import IntentPredictor
+from pc_controller import warm_up
+from llm_client import get_client
+from config import LLM_ENABLED, LLM_WARMUP, TTS_CACHE_ENABLED
+from tts_cache import prerender_async
+
 
+UI_TICK_MS = 33  # ~30 обновлений в секунду
 
 # Стиль в духе Джарвиса: тёмный, с голубыми акцентами
 COLORS = {
@@ -49,6 +64,7 @@ def make_bubble(parent, text: str, is_user: bool, **kwargs) -> ctk.CTkFrame:
         font=ctk.CTkFont(size=14),
     )
     lbl.pack(padx=14, pady=10, anchor="w")
+    f.label = lbl  # чтобы дописывать текст при стриминге
     return f
 
 
@@ -64,9 +80,14 @@ class App(ctk.CTk):
 
         self.predictor: IntentPredictor | None = None
         self.voice_on = ctk.BooleanVar(value=True)
-        self.last_intent: str | None = None
+        self.last_intent: str | None = None  # меняют только рабочие потоки, под _intent_lock
+        self._intent_lock = threading.Lock()
+        self._events: queue.SimpleQueue = queue.SimpleQueue()
+        self._turn_ids = itertools.count(1)
+        self._partial_bubbles: dict[int, ctk.CTkFrame] = {}  # номер хода -> недописанный пузырь
         self._build_ui()
         self.after(200, self._init_model)
+        self.after(UI_TICK_MS, self._tick)
 
     def _build_ui(self):
         # ---- Верхняя панель: логотип + переключатель Вкл/Выкл ----
@@ -172,7 +193,18 @@ class App(ctk.CTk):
             self.voice_label.configure(text_color=COLORS["text_dim"])
         self.btn_mic.configure(state="normal" if on else "disabled")
 
+    def _check_apps(self):
+        missing = warm_up()
+        if missing:
+            msg = f"Не найдены программы для: {', '.join(missing)}. Укажи полный путь в config.APPS или APP_SEARCH_DIRS."
+            self.post("msg", "assistant", msg)
+
     def _init_model(self):
+        if LLM_ENABLED and LLM_WARMUP:
+            get_client().warm_up_async()
+        if TTS_CACHE_ENABLED:
+            prerender_async()
+        threading.Thread(target=self._check_apps, daemon=True).start()
         try:
             if (ROOT / "data" / "intent_model.pt").exists():
                 self.predictor = IntentPredictor()
@@ -184,7 +216,68 @@ class App(ctk.CTk):
             self.predictor = None
             self._add_msg("assistant", f"Ошибка загрузки модели: {e}")
 
-    def _add_msg(self, role: str, text: str):
+    # ---- Очередь событий UI ----
+
+    def post(self, kind: str, *args) -> None:
+        """Из любого потока: msg(role, text[, turn]), partial(turn, text), mic(enabled)."""
+        self._events.put((kind, args))
+
+    def _tick(self):
+        # Следующий тик планируется в любом случае: ошибка одной пачки (например,
+        # TclError на удалённом виджете) не должна остановить доставку событий
+        try:
+            self._apply_events()
+        finally:
+            self.after(UI_TICK_MS, self._tick)
+
+    def _apply_events(self):
+        # Забираем всё накопленное; куски стрима одного хода схлопываются в последний
+        ops: list[tuple] = []
+        partial_at: dict[int, int] = {}  # номер хода -> позиция его partial в ops
+        mic: bool | None = None
+        try:
+            while True:
+                kind, args = self._events.get_nowait()
+                if kind == "mic":
+                    mic = args[0]
+                elif kind == "partial" and args[0] in partial_at:
+                    ops[partial_at[args[0]]] = (kind, *args)
+                else:
+                    if kind == "partial":
+                        partial_at[args[0]] = len(ops)
+                    elif len(args) > 2:
+                        partial_at.pop(args[2], None)
+                    ops.append((kind, *args))
+        except queue.Empty:
+            pass
+
+        for kind, *args in ops:
+            if kind == "partial":
+                turn, text = args
+                bubble = self._partial_bubbles.get(turn)
+                if bubble is None:
+                    self._partial_bubbles[turn] = self._add_msg("assistant", text, scroll=False)
+                else:
+                    bubble.label.configure(text=text)
+                continue
+            role, text, *rest = args
+            bubble = self._partial_bubbles.pop(rest[0], None) if rest else None
+            if bubble is not None:
+                # Итоговый ответ хода встаёт на место его недописанного
+                bubble.label.configure(text=text)
+            else:
+                self._add_msg(role, text, scroll=False)
+        if mic is not None:
+            self.btn_mic.configure(state="normal" if mic else "disabled", text="🎤" if mic else "…")
+        if ops:
+            self._scroll_to_end()
+
+    def _scroll_to_end(self):
+        canvas = getattr(self.chat, "_parent_canvas", None) or getattr(self.chat, "parent_canvas", None)
+        if canvas:
+            canvas.yview_moveto(1.0)
+
+    def _add_msg(self, role: str, text: str, scroll: bool = True) -> ctk.CTkFrame:
         row = ctk.CTkFrame(self.chat, fg_color="transparent")
         row.pack(fill="x", pady=4)
         bubble = make_bubble(row, text, is_user=(role == "user"))
@@ -192,9 +285,9 @@ class App(ctk.CTk):
             bubble.pack(side="right", padx=8)
         else:
             bubble.pack(side="left", padx=8)
-        canvas = getattr(self.chat, "_parent_canvas", None) or getattr(self.chat, "parent_canvas", None)
-        if canvas:
-            canvas.yview_moveto(1.0)
+        if scroll:
+            self._scroll_to_end()
+        return bubble
 
     def _on_send(self):
         t = (self.entry.get() or "").strip()
@@ -211,48 +304,45 @@ class App(ctk.CTk):
         threading.Thread(target=self._voice_thread, daemon=True).start()
 
     def _voice_thread(self):
-        def enable_mic():
-            self.btn_mic.configure(state="normal", text="🎤")
-
         text = listen_once()
         if not text:
-            self.after(0, lambda: self._add_msg("assistant", "Не расслышал. Попробуй ещё раз."))
-            self.after(0, enable_mic)
+            self.post("msg", "assistant", "Не расслышал. Попробуй ещё раз.")
+            self.post("mic", True)
             return
+        self.post("msg", "user", text)
+        self._respond(text, use_speak=self.voice_on.get())
+        self.post("mic", True)
 
-        self.after(0, lambda: self._add_msg("user", text))
-
+    def _respond(self, text: str, use_speak: bool):
+        """Рабочий поток: обработка фразы, ответ в очередь UI, озвучка."""
         if not self.predictor:
-            self.after(0, lambda: self._add_msg("assistant", "Сначала обучи нейросеть: python neural/train.py"))
-            self.after(0, enable_mic)
+            self.post("msg", "assistant", "Сначала обучи нейросеть: python neural/train.py")
             return
-
+        turn = next(self._turn_ids)
         try:
-            resp, _, tag = process(text, self.predictor, self.last_intent)
-            self.after(0, lambda r=resp, t=tag: (self._add_msg("assistant", r), setattr(self, "last_intent", t)))
-            if self.voice_on.get():
-                speak(resp, block=True)
+            with self._intent_lock:
+                last_intent = self.last_intent
+            resp, _, tag = process(
+                text,
+                self.predictor,
+                last_intent,
+                on_partial=lambda p: self.post("partial", turn, p),
+                on_action_error=lambda m: self.post("msg", "assistant", m),
+            )
+            with self._intent_lock:
+                self.last_intent = tag
+            self.post("msg", "assistant", resp, turn)
+            if use_speak:
+                speak(resp, block=True, remember=tag in CACHED_SPEECH_TAGS)
         except Exception as e:
-            self.after(0, lambda: self._add_msg("assistant", f"Ошибка: {e}"))
-        self.after(0, enable_mic)
+            self.post("msg", "assistant", f"Ошибка: {e}", turn)
 
     def _run_process(self, text: str, use_speak: bool):
-        def work():
-            if not self.predictor:
-                self.after(0, lambda: self._add_msg("assistant", "Сначала обучи нейросеть: python neural/train.py"))
-                return
-            try:
-                resp, _, tag = process(text, self.predictor, self.last_intent)
-                self.after(0, lambda r=resp, t=tag: (self._add_msg("assistant", r), setattr(self, "last_intent", t)))
-                if use_speak:
-                    speak(resp, block=True)
-            except Exception as e:
-                self.after(0, lambda: self._add_msg("assistant", f"Ошибка: {e}"))
-
-        threading.Thread(target=work, daemon=True).start()
+        threading.Thread(target=self._respond, args=(text, use_speak), daemon=True).start()
 
 
 def main():
+    metrics.setup()
     app = App()
     app.mainloop()
 
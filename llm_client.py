@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Долгоживущий клиент Ollama для ответов LLM.
+
+Один ollama.Client на всё приложение: HTTP-соединение переиспользуется между
+ходами, у каждого запроса есть таймаут, а keep_alive держит модель в памяти
+Ollama, чтобы после паузы первый ответ не ждал загрузки LLM_MODEL.
+warm_up_async() при старте в фоне загружает модель заранее.
+
+Conversation — история разговора для многоходового чата. Системный промпт
+неизменен, а старые реплики не переписываются, поэтому начало запроса
+совпадает с прошлым и Ollama берёт его из кэша, считая только новые токены.
+"""
+
+import threading
+
+import metrics
+from config import LLM_HISTORY_TOKENS, LLM_HOST, LLM_KEEP_ALIVE, LLM_MODEL, LLM_TIMEOUT
+
+
+class LLMClient:
+    """Обёртка над ollama.Client: пул соединений, keep_alive, таймауты. Ошибки -> None."""
+
+    def __init__(self, model: str = LLM_MODEL, host: str | None = LLM_HOST, timeout: float = LLM_TIMEOUT, keep_alive=LLM_KEEP_ALIVE):
+        self.model = model
+        self.host = host
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self._client = None
+        self._lock = threading.Lock()
+        self.warm = threading.Event()
+
+    def _get(self):
+        with self._lock:
+            if self._client is None:
+                from ollama import Client
+
+                # host=None — ollama сам возьмёт OLLAMA_HOST или localhost:11434
+                self._client = Client(host=self.host, timeout=self.timeout)
+            return self._client
+
+    def chat(self, messages: list[dict], on_partial=None, **options) -> str | None:
+        """
+        Ответ модели на messages или None (нет Ollama, таймаут, пустой ответ).
+        on_partial(текст_пока) — если задан, ответ стримится и колбэк зовётся на каждый кусок.
+        """
+        try:
+            if on_partial is None:
+                r = self._get().chat(model=self.model, messages=messages, keep_alive=self.keep_alive, **options)
+                content = r.message.content or ""
+            else:
+                parts = []
+                stream = self._get().chat(model=self.model, messages=messages, keep_alive=self.keep_alive, stream=True, **options)
+                for chunk in stream:
+                    piece = chunk.message.content or ""
+                    if piece:
+                        parts.append(piece)
+                        on_partial("".join(parts))
+                content = "".join(parts)
+        except Exception:
+            metrics.inc("llm_failures")
+            return None
+        self.warm.set()
+        return content.strip() or None
+
+    def warm_up(self) -> bool:
+        """Загружает модель в память Ollama (пустой запрос generate). True — модель готова."""
+        try:
+            with metrics.span("llm_warmup"):
+                self._get().generate(model=self.model, prompt="", keep_alive=self.keep_alive)
+        except Exception:
+            metrics.inc("llm_warmup_failures")
+            return False
+        self.warm.set()
+        return True
+
+    def warm_up_async(self) -> threading.Thread:
+        t = threading.Thread(target=self.warm_up, daemon=True, name="vegra-llm-warmup")
+        t.start()
+        return t
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов (для кириллицы ~3 символа на токен)."""
+    return len(text) // 3 + 1
+
+
+class Conversation:
+    """
+    Скользящее окно истории с бюджетом в токенах.
+    При переполнении выбрасываются самые старые пары реплик — сразу с запасом
+    (до половины бюджета), чтобы кэш префикса сбрасывался редко, а не каждый ход.
+    turn_lock держат на весь ход (messages -> запрос -> add_turn), чтобы
+    одновременные ходы не перемешали историю.
+    """
+
+    def __init__(self, system: str, max_tokens: int = LLM_HISTORY_TOKENS):
+        self.system = system
+        self.max_tokens = max_tokens
+        self.history: list[dict] = []
+        self._tokens = 0
+        self._lock = threading.Lock()
+        self.turn_lock = threading.Lock()
+
+    def messages(self, user_content: str) -> list[dict]:
+        """Системный промпт + история + новая реплика."""
+        with self._lock:
+            return [{"role": "system", "content": self.system}, *self.history, {"role": "user", "content": user_content}]
+
+    def add_turn(self, user_content: str, reply: str) -> None:
+        """Запоминает ход ровно в том виде, в каком он ушёл в модель (иначе не совпадёт префикс)."""
+        if self.max_tokens <= 0:
+            return
+        with self._lock:
+            self.history.append({"role": "user", "content": user_content})
+            self.history.append({"role": "assistant", "content": reply})
+            self._tokens += estimate_tokens(user_content) + estimate_tokens(reply)
+            if self._tokens > self.max_tokens:
+                while self.history and self._tokens > self.max_tokens // 2:
+                    for m in self.history[:2]:
+                        self._tokens -= estimate_tokens(m["content"])
+                    del self.history[:2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.history.clear()
+            self._tokens = 0
+
+
+_client: LLMClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> LLMClient:
+    """Общий клиент (создаётся при первом обращении)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
+
+
+def set_client(client: LLMClient | None) -> None:
+    """Подменяет общий клиент (например, на клиента заглушки Ollama в бенчмарках)."""
+    global _client
+    with _client_lock:
+        _client = client
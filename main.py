@@ -12,13 +12,26 @@ ROOT = Path(__file__).resolve().parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+import metrics
 from voice_input import listen_once
 from voice_output import speak
-from assistant import process
+from assistant import CACHED_SPEECH_TAGS, process
 from neural.intents_model import IntentPredictor
+from pc_controller import warm_up
+from llm_client import get_client
+from config import LLM_ENABLED, LLM_WARMUP, TTS_CACHE_ENABLED
+from tts_cache import prerender_async
 
 
 def main():
+    metrics.setup()
+    if LLM_ENABLED and LLM_WARMUP:
+        get_client().warm_up_async()
+    if TTS_CACHE_ENABLED:
+        prerender_async()
+    missing = warm_up()
+    if missing:
+        print(f"Не найдены программы для: {', '.join(missing)}. Укажи полный путь в config.APPS или APP_SEARCH_DIRS.")
     print("VegraAI (как Джарвис) запущен. Говори в микрофон. Для выхода скажи «Пока» или «Стоп».\n")
     speak("ВебграАй на связи. Слушаю тебя.", block=True)
 
@@ -27,6 +40,11 @@ def main():
         print("Сначала обучи нейросеть: python neural/train.py")
         return
 
+    def on_action_error(message: str) -> None:
+        # Из потока запуска: ответ «Открываю …» уже прозвучал, сообщаем, что не вышло
+        print(f"VegraAI: {message}\n")
+        speak(message, block=True)
+
     last_intent: str | None = None
     while True:
         print("Говори...")
@@ -36,15 +54,20 @@ def main():
             continue
         print(f"Ты: {text}")
 
-        response, should_exit, tag = process(text, predictor, last_intent)
+        response, should_exit, tag = process(text, predictor, last_intent, on_action_error=on_action_error)
         last_intent = tag
         print(f"VegraAI: {response}\n")
-        speak(response, block=True)
+        speak(response, block=True, remember=tag in CACHED_SPEECH_TAGS)
 
         if should_exit:
             break
 
     print("До встречи.")
+    if metrics.is_enabled():
+        snap = metrics.snapshot()
+        print("\nЗадержки этапов (мс):")
+        for name, s in sorted(snap["spans"].items()):
+            print(f"  {name:<16} n={s['count']:<5} p50≈{s['p50_ms']:<8g} p95≈{s['p95_ms']:<8g} max={s['max_ms']}")
 
 
 if __name__ == "__main__":
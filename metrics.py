@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Лёгкая инструментализация: таймеры этапов (span), счётчики и гистограммы.
+Этапы хода: capture (запись), asr (распознавание), routing (жёсткий фильтр),
+classification (нейросеть), llm, action (ПК), tts (озвучка).
+
+Пока сбор выключен, span() возвращает общий пустой контекст — накладные расходы
+сводятся к одной проверке флага. Включается через setup() (по config) или enable().
+
+Экспорт: JSON lines (по строке на каждый span) и текстовый формат Prometheus
+(HTTP /metrics). Сводка по файлу: python metrics.py data/metrics.jsonl
+Для разбивки по отдельному ходу — with trace() as t: ... (t — {этап: мс} этого потока).
+"""
+
+import contextlib
+import functools
+import json
+import math
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Границы корзин гистограмм, мс
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+PROM_PREFIX = "vegra"
+
+_enabled = False
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_histograms: dict[str, "Histogram"] = {}
+_jsonl = None
+_server: ThreadingHTTPServer | None = None
+_local = threading.local()
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами (как в Prometheus)."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)  # последняя — +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float) -> None:
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе корзины (не больше фактического максимума)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= rank:
+                return min(float(BUCKETS_MS[i]), self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.t0) * 1000
+        observe(self.name, ms, error=exc_type is not None)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def span(name: str):
+    """Контекст-таймер этапа: with span("asr"): ..."""
+    return _Span(name) if _enabled else _NOOP
+
+
+def timed(name: str):
+    """Декоратор: замеряет вызов функции как span с именем name."""
+
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+def inc(name: str, value: float = 1) -> None:
+    """Увеличивает счётчик."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, ms: float, error: bool = False) -> None:
+    """Записывает длительность этапа в гистограмму (и в JSON lines, если включено)."""
+    if not _enabled:
+        return
+    trace_ = getattr(_local, "trace", None)
+    if trace_ is not None:
+        trace_[name] = trace_.get(name, 0.0) + ms
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = Histogram()
+        h.observe(ms)
+        if error:
+            _counters[f"{name}_errors"] = _counters.get(f"{name}_errors", 0) + 1
+        if _jsonl is not None:
+            rec = {"ts": round(time.time(), 3), "span": name, "ms": round(ms, 3)}
+            if error:
+                rec["error"] = True
+            _jsonl.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            _jsonl.flush()
+
+
+@contextlib.contextmanager
+def trace():
+    """Собирает длительности этапов текущего потока в словарь {этап: мс} (при включённом сборе)."""
+    prev = getattr(_local, "trace", None)
+    _local.trace = {}
+    try:
+        yield _local.trace
+    finally:
+        _local.trace = prev
+
+
+def enable(jsonl_path: str | None = None) -> None:
+    """Включает сбор; jsonl_path — куда дописывать события (None — только в памяти)."""
+    global _enabled, _jsonl
+    with _lock:
+        if jsonl_path and _jsonl is None:
+            _jsonl = open(jsonl_path, "a", encoding="utf-8")
+        _enabled = True
+
+
+def disable() -> None:
+    global _enabled, _jsonl
+    with _lock:
+        _enabled = False
+        if _jsonl is not None:
+            _jsonl.close()
+            _jsonl = None
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def snapshot() -> dict:
+    """Текущее состояние: {"counters": {...}, "spans": {имя: {count, sum_ms, p50_ms, p95_ms, max_ms}}}."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "spans": {
+                name: {
+                    "count": h.count,
+                    "sum_ms": round(h.sum, 3),
+                    "p50_ms": h.quantile(0.5),
+                    "p95_ms": h.quantile(0.95),
+                    "max_ms": round(h.max, 3),
+                }
+                for name, h in _histograms.items()
+            },
+        }
+
+
+def prometheus_text() -> str:
+    """Метрики в текстовом формате Prometheus."""
+    lines = []
+    with _lock:
+        for name, value in sorted(_counters.items()):
+            metric = f"{PROM_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        metric = f"{PROM_PREFIX}_stage_duration_ms"
+        if _histograms:
+            lines.append(f"# TYPE {metric} histogram")
+        for name, h in sorted(_histograms.items()):
+            acc = 0
+            for bound, c in zip(BUCKETS_MS, h.counts):
+                acc += c
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {acc}')
+            lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {h.sum:.3f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {h.count}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_prometheus(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Поднимает в фоне HTTP-эндпоинт /metrics."""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+def setup() -> None:
+    """Включает сбор по настройкам config (METRICS_ENABLED, METRICS_JSONL_PATH, METRICS_PROMETHEUS_PORT)."""
+    from config import METRICS_ENABLED, METRICS_JSONL_PATH, METRICS_PROMETHEUS_PORT
+
+    if not METRICS_ENABLED:
+        return
+    enable(METRICS_JSONL_PATH)
+    if METRICS_PROMETHEUS_PORT:
+        serve_prometheus(METRICS_PROMETHEUS_PORT)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = min(len(s) - 1, max(0, math.ceil(q * len(s)) - 1))
+    return s[k]
+
+
+def format_summary(durations: dict[str, list[float]], counters: dict[str, float] | None = None) -> str:
+    """Таблица по этапам: число, среднее, p50, p95, максимум (мс)."""
+    w = max([16, *(len(n) + 1 for n in durations), *(len(n) + 1 for n in counters or {})])
+    rows = [f"{'этап':<{w}}{'n':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}"]
+    for name, vals in sorted(durations.items(), key=lambda kv: -sum(kv[1])):
+        rows.append(
+            f"{name:<{w}}{len(vals):>7}{sum(vals) / len(vals):>10.1f}"
+            f"{_percentile(vals, 0.5):>10.1f}{_percentile(vals, 0.95):>10.1f}{max(vals):>10.1f}"
+        )
+    for name, value in sorted((counters or {}).items()):
+        rows.append(f"{name:<{w}}{value:>7g}")
+    return "\n".join(rows)
+
+
+def summarize_jsonl(path: str) -> str:
+    """Сводка по файлу JSON lines, записанному enable(jsonl_path)."""
+    durations: dict[str, list[float]] = {}
+    errors: dict[str, float] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            durations.setdefault(rec["span"], []).append(rec["ms"])
+            if rec.get("error"):
+                errors[f"{rec['span']}_errors"] = errors.get(f"{rec['span']}_errors", 0) + 1
+    return format_summary(durations, errors)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Использование: python metrics.py data/metrics.jsonl")
+        sys.exit(1)
+    print(summarize_jsonl(sys.argv[1]))
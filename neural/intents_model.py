@@ -10,8 +10,21 @@ from pathlib import Path
 import torch
 import torch.nn as nn
 
+import metrics
 from config import INTENTS_FILE, MODEL_PATH, VOCAB_PATH
 
+# Гиперпараметры по умолчанию. Архитектурные (embedding_dim, hidden_dim, max_len)
+# сохраняются вместе с весами в intent_model.pt — предсказатель читает их оттуда.
+DEFAULT_HPARAMS = {
+    "embedding_dim": 64,
+    "hidden_dim": 64,
+    "max_len": 20,
+    "lr": 1e-3,
+    "epochs": 60,
+    "batch_size": 16,
+}
+ARCH_KEYS = ("embedding_dim", "hidden_dim", "max_len")
+
 
 def tokenize(text: str) -> list[str]:
     """Разбивает текст на слова (нижний регистр, только буквы и цифры)."""
@@ -21,6 +34,35 @@ def tokenize(text: str) -> list[str]:
     return [w.lower() for w in words] if words else ["<пусто>"]
 
 
+def encode(words: list[str], vocab: dict[str, int], max_len: int) -> list[int]:
+    """Слова -> индексы словаря, обрезка/дополнение нулями (PAD) до max_len."""
+    ids = [vocab.get(w, vocab.get("<unk>", 1)) for w in words]
+    if len(ids) > max_len:
+        ids = ids[:max_len]
+    while len(ids) < max_len:
+        ids.append(0)  # PAD
+    return ids
+
+
+def save_checkpoint(model: "IntentClassifier", hparams: dict, path) -> None:
+    """Сохраняет веса вместе с архитектурными гиперпараметрами."""
+    arch = {k: hparams[k] for k in ARCH_KEYS}
+    torch.save({"hparams": arch, "state_dict": model.state_dict()}, path)
+
+
+def load_checkpoint(path) -> tuple[dict, dict]:
+    """
+    Возвращает (гиперпараметры, state_dict).
+    Старые файлы содержат только state_dict — для них берутся DEFAULT_HPARAMS.
+    """
+    obj = torch.load(path, map_location="cpu")
+    if isinstance(obj, dict) and "state_dict" in obj:
+        hparams = {k: DEFAULT_HPARAMS[k] for k in ARCH_KEYS}
+        hparams.update(obj.get("hparams") or {})
+        return hparams, obj["state_dict"]
+    return {k: DEFAULT_HPARAMS[k] for k in ARCH_KEYS}, obj
+
+
 class IntentClassifier(nn.Module):
     """Простая сеть: Embedding -> LSTM -> FC -> класс намерения."""
 
@@ -50,7 +92,8 @@ class IntentPredictor:
         self.vocab: dict[str, int] = {}
         self.idx_to_tag: list[str] = []
         self.model: IntentClassifier | None = None
-        self.max_len = 20
+        self.max_len = DEFAULT_HPARAMS["max_len"]
+        self.hparams: dict = {}
         self._loaded = False
 
     def _ensure_loaded(self):
@@ -66,27 +109,36 @@ class IntentPredictor:
         self.idx_to_tag = data["tags"]
         num_classes = len(self.idx_to_tag)
         vocab_size = len(self.vocab)
+        self.hparams, state_dict = load_checkpoint(self.model_path)
+        self.max_len = self.hparams["max_len"]
         self.model = IntentClassifier(
             vocab_size=vocab_size,
-            embedding_dim=64,
-            hidden_dim=64,
+            embedding_dim=self.hparams["embedding_dim"],
+            hidden_dim=self.hparams["hidden_dim"],
             num_classes=num_classes,
         )
-        self.model.load_state_dict(torch.load(self.model_path, map_location="cpu"))
+        self.model.load_state_dict(state_dict)
         self.model.eval()
         self._loaded = True
 
+    @metrics.timed("classification")
     def predict(self, text: str) -> str:
         """Возвращает тег намерения (например, 'открыть_приложение')."""
         self._ensure_loaded()
-        words = tokenize(text)
-        ids = [self.vocab.get(w, self.vocab.get("<unk>", 1)) for w in words]
-        if len(ids) > self.max_len:
-            ids = ids[: self.max_len]
-        while len(ids) < self.max_len:
-            ids.append(0)  # PAD
+        ids = encode(tokenize(text), self.vocab, self.max_len)
         x = torch.tensor([ids], dtype=torch.long)
         with torch.no_grad():
             logits = self.model(x)
         pred = logits.argmax(dim=1).item()
         return self.idx_to_tag[pred]
+
+    @metrics.timed("classification")
+    def predict_batch(self, texts: list[str]) -> list[str]:
+        """То же, что predict, но для списка фраз за один проход сети."""
+        if not texts:
+            return []
+        self._ensure_loaded()
+        x = torch.tensor([encode(tokenize(t), self.vocab, self.max_len) for t in texts], dtype=torch.long)
+        with torch.no_grad():
+            logits = self.model(x)
+        return [self.idx_to_tag[i] for i in logits.argmax(dim=1).tolist()]
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Локальные ответы вместо LLM для разговорных тегов.
+
+Из журнала (фраза, тег, ответ LLM) ответы каждого тега группируются в кластеры
+похожих реплик — «банк ответов». Небольшая сеть (EmbeddingBag -> FC) учится
+по фразе выбирать кластер. Если сеть уверена и фраза не слишком новая
+(большинство слов знакомо), ответ берётся из банка за миллисекунды;
+иначе — как раньше, LLM.
+"""
+
+import json
+import random
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+
+from neural.intents_model import encode, tokenize
+import metrics
+from config import REPLY_BANK_PATH, REPLY_MIN_CONFIDENCE, REPLY_MIN_KNOWN, REPLY_MODEL_PATH
+
+DEFAULT_REPLY_HPARAMS = {
+    "embedding_dim": 64,
+    "max_len": 20,
+    "lr": 5e-3,
+    "epochs": 40,
+    "batch_size": 32,
+}
+
+
+def similarity(a: str, b: str) -> float:
+    """Сходство реплик: коэффициент Жаккара по словам."""
+    wa, wb = set(tokenize(a)), set(tokenize(b))
+    return len(wa & wb) / len(wa | wb) if wa or wb else 1.0
+
+
+def cluster_replies(replies: list[str], threshold: float = 0.5) -> list[list[int]]:
+    """
+    Жадная кластеризация: реплика идёт в первый кластер, с лидером которого
+    сходство не ниже threshold, иначе открывает новый. Возвращает списки индексов.
+    """
+    clusters: list[list[int]] = []
+    leaders: list[str] = []
+    for i, r in enumerate(replies):
+        for c, lead in enumerate(leaders):
+            if similarity(r, lead) >= threshold:
+                clusters[c].append(i)
+                break
+        else:
+            clusters.append([i])
+            leaders.append(r)
+    return clusters
+
+
+def medoid(texts: list[str]) -> int:
+    """Индекс реплики, в среднем самой похожей на остальные в кластере."""
+    if len(texts) <= 2:
+        return 0
+    return max(range(len(texts)), key=lambda i: sum(similarity(texts[i], t) for t in texts))
+
+
+class ReplyRanker(nn.Module):
+    """Фраза -> кластер ответа: EmbeddingBag (среднее по словам) -> FC."""
+
+    def __init__(self, vocab_size: int, embedding_dim: int, num_clusters: int, pad_idx: int = 0):
+        super().__init__()
+        self.embed = nn.EmbeddingBag(vocab_size, embedding_dim, mode="mean", padding_idx=pad_idx)
+        self.fc = nn.Linear(embedding_dim, num_clusters)
+
+    def forward(self, x):
+        # x: [batch, seq_len]
+        return self.fc(self.embed(x))
+
+
+class ReplyPredictor:
+    """Загружает банк ответов и ранжировщик; предлагает локальный ответ или None."""
+
+    def __init__(self, bank_path: str = None, model_path: str = None, min_confidence: float = REPLY_MIN_CONFIDENCE):
+        self.bank_path = Path(bank_path or REPLY_BANK_PATH)
+        self.model_path = Path(model_path or REPLY_MODEL_PATH)
+        self.min_confidence = min_confidence
+        self.vocab: dict[str, int] = {}
+        self.clusters: list[dict] = []
+        self.tag_clusters: dict[str, list[int]] = {}
+        self.model: ReplyRanker | None = None
+        self.max_len = DEFAULT_REPLY_HPARAMS["max_len"]
+        self._loaded = False
+
+    def available(self) -> bool:
+        return self._loaded or (self.bank_path.exists() and self.model_path.exists())
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        if not self.available():
+            raise FileNotFoundError("Банк ответов не собран. Запусти: python neural/train_replies.py")
+        with open(self.bank_path, "r", encoding="utf-8") as f:
+            bank = json.load(f)
+        self.vocab = bank["vocab"]
+        self.clusters = bank["clusters"]
+        self.tag_clusters = {}
+        for i, c in enumerate(self.clusters):
+            self.tag_clusters.setdefault(c["tag"], []).append(i)
+        ckpt = torch.load(self.model_path, map_location="cpu")
+        hp = {**DEFAULT_REPLY_HPARAMS, **ckpt.get("hparams", {})}
+        self.max_len = hp["max_len"]
+        self.model = ReplyRanker(len(self.vocab), hp["embedding_dim"], len(self.clusters))
+        self.model.load_state_dict(ckpt["state_dict"])
+        self.model.eval()
+        self._loaded = True
+
+    def known_ratio(self, words: list[str]) -> float:
+        return sum(w in self.vocab for w in words) / len(words) if words else 0.0
+
+    def score(self, text: str, tag: str) -> tuple[int, float] | None:
+        """Лучший кластер тега и его вероятность (среди всех кластеров) или None."""
+        self._ensure_loaded()
+        candidates = self.tag_clusters.get(tag)
+        if not candidates:
+            return None
+        words = tokenize(text)
+        if self.known_ratio(words) < REPLY_MIN_KNOWN:
+            return None  # новая для банка фраза — пусть отвечает LLM
+        x = torch.tensor([encode(words, self.vocab, self.max_len)], dtype=torch.long)
+        with torch.no_grad():
+            probs = torch.softmax(self.model(x)[0], dim=0)
+        best = max(candidates, key=lambda i: probs[i].item())
+        return best, probs[best].item()
+
+    @metrics.timed("reply_rank")
+    def reply(self, text: str, tag: str) -> str | None:
+        """Ответ из банка, если ранжировщик уверен (вероятность >= min_confidence)."""
+        scored = self.score(text, tag)
+        if scored is None or scored[1] < self.min_confidence:
+            return None
+        return random.choice(self.clusters[scored[0]]["replies"])
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Перебор гиперпараметров IntentClassifier и выбор модели для деплоя.
+Каждая конфигурация обучается в отдельном процессе (по ядру на конфигурацию),
+для неё замеряются точность на отложенной выборке, размер модели и задержка predict.
+Для деплоя берётся лучшая по точности модель с фронта Парето (точность / размер / задержка).
+
+Запуск: python neural/sweep.py [--workers N] [--deploy]
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import argparse
+import io
+import itertools
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import torch
+
+from neural.intents_model import DEFAULT_HPARAMS, encode
+from neural.train import build_vocab, load_intents, save_model, train_model
+from config import INTENTS_FILE
+
+SWEEP_RESULTS_PATH = "data/sweep_results.json"
+
+# Сетка по умолчанию: декартово произведение значений
+DEFAULT_GRID = {
+    "embedding_dim": [32, 64, 128],
+    "hidden_dim": [32, 64, 128],
+    "max_len": [12, 20],
+    "lr": [1e-3, 3e-3],
+    "epochs": [60],
+}
+
+
+def grid_configs(grid: dict) -> list[dict]:
+    """Разворачивает сетку в список конфигураций."""
+    keys = list(grid)
+    return [{**DEFAULT_HPARAMS, **dict(zip(keys, values))} for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def split_samples(samples, every: int = 5):
+    """Каждый every-й пример тега уходит в валидацию (если у тега хотя бы 3 примера)."""
+    by_tag: dict[str, list] = {}
+    for s in samples:
+        by_tag.setdefault(s[1], []).append(s)
+    train, val = [], []
+    for items in by_tag.values():
+        for i, s in enumerate(items):
+            if len(items) >= 3 and i % every == every - 1:
+                val.append(s)
+            else:
+                train.append(s)
+    return train, val
+
+
+def model_size_bytes(model) -> int:
+    buf = io.BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell()
+
+
+def evaluate(hparams: dict, train, val, tags, seed: int = 0) -> dict:
+    """Обучает одну конфигурацию и возвращает её метрики. Выполняется в дочернем процессе."""
+    torch.set_num_threads(1)  # процессов и так по числу ядер
+    vocab = build_vocab(train)
+    model = train_model(train, vocab, tags, hparams, seed=seed, verbose=False)
+    tag_to_idx = {t: i for i, t in enumerate(tags)}
+
+    x = torch.tensor([encode(w, vocab, hparams["max_len"]) for w, _ in val], dtype=torch.long)
+    y = torch.tensor([tag_to_idx[t] for _, t in val], dtype=torch.long)
+    latencies = []
+    with torch.no_grad():
+        pred = model(x).argmax(dim=1)
+        for i in range(len(val)):
+            t0 = time.perf_counter()
+            model(x[i : i + 1])
+            latencies.append((time.perf_counter() - t0) * 1000)
+    return {
+        "hparams": hparams,
+        "accuracy": (pred == y).float().mean().item() if len(val) else 0.0,
+        "params": sum(p.numel() for p in model.parameters()),
+        "size_bytes": model_size_bytes(model),
+        "latency_ms": statistics.median(latencies) if latencies else 0.0,
+    }
+
+
+def _dominates(a: dict, b: dict) -> bool:
+    better_or_equal = (
+        a["accuracy"] >= b["accuracy"] and a["size_bytes"] <= b["size_bytes"] and a["latency_ms"] <= b["latency_ms"]
+    )
+    strictly = a["accuracy"] > b["accuracy"] or a["size_bytes"] < b["size_bytes"] or a["latency_ms"] < b["latency_ms"]
+    return better_or_equal and strictly
+
+
+def pareto_front(results: list[dict]) -> list[dict]:
+    """Конфигурации, которые не хуже других сразу по точности, размеру и задержке."""
+    return [r for r in results if not any(_dominates(o, r) for o in results if o is not r)]
+
+
+def pick_best(results: list[dict]) -> dict:
+    """С фронта Парето — максимальная точность, при равенстве — быстрее и меньше."""
+    front = pareto_front(results)
+    return max(front, key=lambda r: (round(r["accuracy"], 4), -r["latency_ms"], -r["size_bytes"]))
+
+
+def run_sweep(grid: dict = None, workers: int | None = None, seed: int = 0) -> list[dict]:
+    samples = load_intents(str(ROOT / INTENTS_FILE))
+    tags = sorted(set(s[1] for s in samples))
+    train, val = split_samples(samples)
+    configs = grid_configs(grid or DEFAULT_GRID)
+    workers = workers or os.cpu_count() or 1
+    print(f"Конфигураций: {len(configs)}, процессов: {workers}, обучение/валидация: {len(train)}/{len(val)}")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(evaluate, hp, train, val, tags, seed) for hp in configs]
+        for fut in as_completed(futures):
+            r = fut.result()
+            results.append(r)
+            hp = r["hparams"]
+            print(
+                f"emb={hp['embedding_dim']} hid={hp['hidden_dim']} len={hp['max_len']} lr={hp['lr']}: "
+                f"acc={r['accuracy']:.3f} size={r['size_bytes'] / 1024:.0f}КБ lat={r['latency_ms']:.2f}мс"
+            )
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Перебор гиперпараметров классификатора намерений")
+    ap.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию — все ядра)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--deploy", action="store_true", help="переобучить лучшую конфигурацию на всех данных и сохранить")
+    args = ap.parse_args()
+
+    results = run_sweep(workers=args.workers, seed=args.seed)
+    front = pareto_front(results)
+    best = pick_best(results)
+    for r in front:
+        r["pareto"] = True
+    best["selected"] = True
+
+    out = ROOT / SWEEP_RESULTS_PATH
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nФронт Парето: {len(front)} из {len(results)}. Результаты: {out}")
+    print(f"Выбрано: {best['hparams']} (acc={best['accuracy']:.3f}, {best['latency_ms']:.2f}мс)")
+
+    if args.deploy:
+        samples = load_intents(str(ROOT / INTENTS_FILE))
+        tags = sorted(set(s[1] for s in samples))
+        vocab = build_vocab(samples)
+        model = train_model(samples, vocab, tags, best["hparams"], seed=args.seed)
+        save_model(model, vocab, tags, best["hparams"])
+        print("Лучшая модель сохранена для деплоя.")
+
+
+if __name__ == "__main__":
+    main()
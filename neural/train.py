@@ -12,13 +12,13 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 import json
-import re
+import random
 
 import torch
 import torch.nn as nn
 from torch.utils.data import Dataset, DataLoader
 
-from neural.intents_model import IntentClassifier, tokenize
+from neural.intents_model import DEFAULT_HPARAMS, IntentClassifier, encode, save_checkpoint, tokenize
 from config import INTENTS_FILE, MODEL_PATH, VOCAB_PATH
 
 
@@ -47,11 +47,7 @@ class IntentsDataset(Dataset):
 
     def __getitem__(self, i):
         words, tag = self.samples[i]
-        ids = [self.vocab.get(w, self.vocab.get("<unk>", 1)) for w in words]
-        if len(ids) > self.max_len:
-            ids = ids[: self.max_len]
-        while len(ids) < self.max_len:
-            ids.append(0)
+        ids = encode(words, self.vocab, self.max_len)
         return torch.tensor(ids, dtype=torch.long), self.tag_to_idx[tag]
 
 
@@ -64,32 +60,25 @@ def build_vocab(samples) -> dict[str, int]:
     return vocab
 
 
-def main():
-    path = ROOT / INTENTS_FILE
-    if not path.exists():
-        print(f"Файл не найден: {path}")
-        return
-    samples = load_intents(str(path))
-    tags = sorted(set(s[1] for s in samples))
-    vocab = build_vocab(samples)
-
-    (ROOT / MODEL_PATH).parent.mkdir(parents=True, exist_ok=True)
-    (ROOT / VOCAB_PATH).parent.mkdir(parents=True, exist_ok=True)
-
-    dataset = IntentsDataset(samples, vocab, tags)
-    loader = DataLoader(dataset, batch_size=16, shuffle=True)
-    print(f"Интентов: {len(tags)}, примеров: {len(samples)}")
+def train_model(samples, vocab, tags, hparams: dict | None = None, seed: int | None = None, verbose: bool = True) -> IntentClassifier:
+    """Обучает IntentClassifier с заданными гиперпараметрами (недостающие — из DEFAULT_HPARAMS)."""
+    hp = {**DEFAULT_HPARAMS, **(hparams or {})}
+    if seed is not None:
+        random.seed(seed)
+        torch.manual_seed(seed)
+    dataset = IntentsDataset(samples, vocab, tags, max_len=hp["max_len"])
+    loader = DataLoader(dataset, batch_size=hp["batch_size"], shuffle=True)
 
     model = IntentClassifier(
         vocab_size=len(vocab),
-        embedding_dim=64,
-        hidden_dim=64,
+        embedding_dim=hp["embedding_dim"],
+        hidden_dim=hp["hidden_dim"],
         num_classes=len(tags),
     )
-    opt = torch.optim.Adam(model.parameters(), lr=1e-3)
+    opt = torch.optim.Adam(model.parameters(), lr=hp["lr"])
     loss_fn = nn.CrossEntropyLoss()
 
-    for epoch in range(60):
+    for epoch in range(hp["epochs"]):
         total = 0
         for x, y in loader:
             opt.zero_grad()
@@ -98,12 +87,34 @@ def main():
             loss.backward()
             opt.step()
             total += loss.item()
-        if (epoch + 1) % 10 == 0:
+        if verbose and (epoch + 1) % 10 == 0:
             print(f"Эпоха {epoch+1}, loss: {total/len(loader):.4f}")
+    model.eval()
+    return model
+
 
-    torch.save(model.state_dict(), ROOT / MODEL_PATH)
+def save_model(model: IntentClassifier, vocab, tags, hparams: dict | None = None) -> None:
+    """Сохраняет веса (с гиперпараметрами) в MODEL_PATH и словарь в VOCAB_PATH."""
+    hp = {**DEFAULT_HPARAMS, **(hparams or {})}
+    (ROOT / MODEL_PATH).parent.mkdir(parents=True, exist_ok=True)
+    (ROOT / VOCAB_PATH).parent.mkdir(parents=True, exist_ok=True)
+    save_checkpoint(model, hp, ROOT / MODEL_PATH)
     with open(ROOT / VOCAB_PATH, "w", encoding="utf-8") as f:
         json.dump({"vocab": vocab, "tags": tags}, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    path = ROOT / INTENTS_FILE
+    if not path.exists():
+        print(f"Файл не найден: {path}")
+        return
+    samples = load_intents(str(path))
+    tags = sorted(set(s[1] for s in samples))
+    vocab = build_vocab(samples)
+    print(f"Интентов: {len(tags)}, примеров: {len(samples)}")
+
+    model = train_model(samples, vocab, tags, DEFAULT_HPARAMS)
+    save_model(model, vocab, tags, DEFAULT_HPARAMS)
     print(f"Модель сохранена: {ROOT / MODEL_PATH}")
     print(f"Словарь: {ROOT / VOCAB_PATH}")
 
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Сборка банка ответов и обучение ранжировщика по журналу ответов LLM.
+Журнал (data/llm_replies.jsonl) пишет assistant при каждом ответе LLM; его прошлая
+часть после ротации (data/llm_replies.1.jsonl) читается тоже.
+
+Запуск:
+    python neural/train_replies.py          — собрать банк и обучить на всём журнале
+    python neural/train_replies.py --eval   — офлайн-оценка: покрытие и качество по порогам
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import argparse
+import json
+import random
+
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+
+from neural.intents_model import tokenize
+from neural.reply_model import DEFAULT_REPLY_HPARAMS, ReplyPredictor, ReplyRanker, cluster_replies, medoid, similarity
+from neural.train import IntentsDataset, build_vocab
+from config import REPLY_BANK_PATH, REPLY_LOG_BACKUP_PATH, REPLY_LOG_PATH, REPLY_MODEL_PATH
+
+CLUSTER_THRESHOLD = 0.5   # сходство реплик для одного кластера
+MIN_CLUSTER_SIZE = 2      # разовые ответы в банк не идут
+MAX_ALTERNATIVES = 5      # сколько вариантов ответа хранить на кластер
+EVAL_THRESHOLDS = (0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+
+def load_log(path: str) -> list[dict]:
+    """Тройки {text, tag, reply} из журнала."""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rec = json.loads(line)
+                if rec.get("text") and rec.get("tag") and rec.get("reply"):
+                    items.append(rec)
+    return items
+
+
+def build_bank(triples: list[dict]) -> tuple[list[dict], list[tuple[list[str], int]]]:
+    """
+    Кластеры ответов по тегам и обучающие пары (слова фразы, номер кластера).
+    В кластере первым идёт медоид — самый «типичный» ответ.
+    """
+    by_tag: dict[str, list[dict]] = {}
+    for t in triples:
+        by_tag.setdefault(t["tag"], []).append(t)
+    clusters, samples = [], []
+    for tag in sorted(by_tag):
+        items = by_tag[tag]
+        for members in cluster_replies([t["reply"] for t in items], CLUSTER_THRESHOLD):
+            if len(members) < MIN_CLUSTER_SIZE:
+                continue
+            replies = list(dict.fromkeys(items[i]["reply"] for i in members))
+            m = medoid(replies)
+            replies.insert(0, replies.pop(m))
+            idx = len(clusters)
+            clusters.append({"tag": tag, "replies": replies[:MAX_ALTERNATIVES], "size": len(members)})
+            samples.extend((tokenize(items[i]["text"]), idx) for i in members)
+    return clusters, samples
+
+
+def train_ranker(samples, vocab, num_clusters: int, hparams: dict | None = None, seed: int = 0) -> ReplyRanker:
+    hp = {**DEFAULT_REPLY_HPARAMS, **(hparams or {})}
+    random.seed(seed)
+    torch.manual_seed(seed)
+    dataset = IntentsDataset(samples, vocab, list(range(num_clusters)), max_len=hp["max_len"])
+    loader = DataLoader(dataset, batch_size=hp["batch_size"], shuffle=True)
+    model = ReplyRanker(len(vocab), hp["embedding_dim"], num_clusters)
+    opt = torch.optim.Adam(model.parameters(), lr=hp["lr"])
+    loss_fn = nn.CrossEntropyLoss()
+    for _ in range(hp["epochs"]):
+        for x, y in loader:
+            opt.zero_grad()
+            loss = loss_fn(model(x), y)
+            loss.backward()
+            opt.step()
+    model.eval()
+    return model
+
+
+def fit(triples: list[dict], bank_path: Path, model_path: Path) -> tuple[int, int]:
+    """Собирает банк, обучает ранжировщик и сохраняет оба. Возвращает (кластеров, примеров)."""
+    clusters, samples = build_bank(triples)
+    if not clusters:
+        return 0, 0
+    vocab = build_vocab(samples)
+    model = train_ranker(samples, vocab, len(clusters))
+    bank_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(bank_path, "w", encoding="utf-8") as f:
+        json.dump({"vocab": vocab, "clusters": clusters}, f, ensure_ascii=False, indent=2)
+    hp = {k: DEFAULT_REPLY_HPARAMS[k] for k in ("embedding_dim", "max_len")}
+    torch.save({"hparams": hp, "state_dict": model.state_dict()}, model_path)
+    return len(clusters), len(samples)
+
+
+def evaluate(triples: list[dict], every: int = 5) -> None:
+    """
+    Каждая every-я тройка — в тест, на остальных собирается банк. Для каждого порога:
+    покрытие — доля тестовых фраз, отвеченных локально; качество — среднее сходство
+    локального ответа с настоящим ответом LLM; попадание — доля, где ответ LLM
+    похож на выбранный кластер не меньше порога кластеризации.
+    """
+    import tempfile
+
+    train = [t for i, t in enumerate(triples) if i % every != every - 1]
+    test = [t for i, t in enumerate(triples) if i % every == every - 1]
+    with tempfile.TemporaryDirectory() as tmp:
+        bank_path, model_path = Path(tmp) / "bank.json", Path(tmp) / "ranker.pt"
+        n_clusters, n_samples = fit(train, bank_path, model_path)
+        print(f"Обучение: {len(train)} троек -> {n_clusters} кластеров ({n_samples} примеров). Тест: {len(test)}")
+        if not n_clusters or not test:
+            print("Мало данных для оценки.")
+            return
+        pred = ReplyPredictor(str(bank_path), str(model_path))
+        scored = [(t, pred.score(t["text"], t["tag"])) for t in test]
+
+    print(f"{'порог':>7}{'покрытие':>10}{'качество':>10}{'попадание':>11}")
+    for th in EVAL_THRESHOLDS:
+        covered = [(t, s) for t, s in scored if s is not None and s[1] >= th]
+        if not covered:
+            print(f"{th:>7.2f}{0:>10.1%}{'—':>10}{'—':>11}")
+            continue
+        sims = [similarity(pred.clusters[s[0]]["replies"][0], t["reply"]) for t, s in covered]
+        hits = sum(
+            max(similarity(r, t["reply"]) for r in pred.clusters[s[0]]["replies"]) >= CLUSTER_THRESHOLD for t, s in covered
+        )
+        print(f"{th:>7.2f}{len(covered) / len(test):>10.1%}{sum(sims) / len(sims):>10.2f}{hits / len(covered):>11.1%}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Банк ответов и ранжировщик из журнала ответов LLM")
+    ap.add_argument("--log", nargs="+", default=None, help="журналы (по умолчанию — текущий и прошлая часть)")
+    ap.add_argument("--eval", action="store_true", help="только офлайн-оценка покрытия и качества")
+    args = ap.parse_args()
+
+    logs = args.log or [str(ROOT / REPLY_LOG_BACKUP_PATH), str(ROOT / REPLY_LOG_PATH)]
+    logs = [p for p in logs if Path(p).exists()]
+    if not logs:
+        print(f"Журнал не найден: {ROOT / REPLY_LOG_PATH}. Он пополняется сам, пока VegraAI отвечает через LLM.")
+        return
+    triples = [t for p in logs for t in load_log(p)]
+    print(f"Троек в журнале: {len(triples)}")
+    if args.eval:
+        evaluate(triples)
+        return
+    n_clusters, n_samples = fit(triples, ROOT / REPLY_BANK_PATH, ROOT / REPLY_MODEL_PATH)
+    if not n_clusters:
+        print("Повторяющихся ответов пока нет — банк не собран.")
+        return
+    print(f"Кластеров: {n_clusters}, примеров: {n_samples}")
+    print(f"Банк: {ROOT / REPLY_BANK_PATH}")
+    print(f"Модель: {ROOT / REPLY_MODEL_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Локальная заглушка сервера Ollama для бенчмарков и проверок без настоящей модели.
+Отвечает на POST /api/chat (в том числе stream) и /api/generate фиксированным текстом
+с заданной задержкой.
+
+    with OllamaStub(delay=0.05) as stub:
+        os.environ["OLLAMA_HOST"] = stub.url
+        ...
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_REPLY = "Всё отлично, спасибо что спросил. Чем займёмся?"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, как у настоящего сервера
+    disable_nagle_algorithm = True  # иначе заголовки и тело ответа ждут ACK лишние ~40 мс
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        stub: "OllamaStub" = self.server.stub
+        stub.requests.append({"path": self.path, "body": body})
+        if stub.delay:
+            time.sleep(stub.delay)
+        base = {"model": body.get("model", ""), "created_at": "1970-01-01T00:00:00Z", "done": True, "done_reason": "stop"}
+        if self.path == "/api/chat" and body.get("stream"):
+            # Стрим — NDJSON, по слову в строке, последняя строка с done
+            words = stub.reply.split(" ")
+            lines = [
+                {**base, "done": False, "message": {"role": "assistant", "content": w + (" " if i < len(words) - 1 else "")}}
+                for i, w in enumerate(words)
+            ]
+            lines.append({**base, "message": {"role": "assistant", "content": ""}})
+            self._send(b"".join(json.dumps(x, ensure_ascii=False).encode("utf-8") + b"\n" for x in lines), "application/x-ndjson")
+            return
+        if self.path == "/api/chat":
+            out = {**base, "message": {"role": "assistant", "content": stub.reply}}
+        elif self.path == "/api/generate":
+            out = {**base, "response": stub.reply, "context": [1, 2, 3]}
+        else:
+            self.send_error(404)
+            return
+        self._send(json.dumps(out, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def _send(self, data: bytes, content_type: str) -> None:
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type + "; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except ConnectionError:
+            pass  # клиент не дождался (таймаут) — это нормальный сценарий проверки
+
+    def log_message(self, format, *args):
+        pass
+
+
+class OllamaStub:
+    """Заглушка Ollama на 127.0.0.1 со свободным портом. requests — журнал принятых запросов."""
+
+    def __init__(self, reply: str = STUB_REPLY, delay: float = 0.0):
+        self.reply = reply
+        self.delay = delay
+        self.requests: list[dict] = []
+        self._server: ThreadingHTTPServer | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OllamaStub":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -1,54 +1,135 @@
 # -*- coding: utf-8 -*-
 """
 Управление ПК: открытие приложений, поиск в браузере.
+
+Запуск идёт в фоне (ActionExecutor): open_app / search_in_browser сразу
+возвращают ответ, а процесс создаётся в пуле потоков. Команды запускаются
+напрямую, без cmd.exe: пути к .exe заранее находит AppRegistry (app_registry.py),
+ms-settings:, URL и ненайденные программы открываются через os.startfile.
 """
 
+import os
 import subprocess
+import threading
 import urllib.parse
-from pathlib import Path
+import webbrowser
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
 
+import metrics
+from app_registry import AppRegistry, is_uri
 from config import APPS, SEARCH_URL
 
+# Колбэк результата запуска: (что запускали, успех)
+OnDone = Callable[[str, bool], None]
+
+
+class ActionExecutor:
+    """Фоновый запуск команд по путям из AppRegistry с учётом запущенных процессов."""
+
+    def __init__(self, registry: AppRegistry | None = None, max_workers: int = 2):
+        self.registry = registry or AppRegistry()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vegra-action")
+        self._lock = threading.Lock()
+        self.processes: list[subprocess.Popen] = []
+
+    def _launch(self, cmd: str) -> bool:
+        with metrics.span("action_launch"):
+            if is_uri(cmd):
+                if cmd.startswith("ms-") and hasattr(os, "startfile"):
+                    os.startfile(cmd)
+                    return True
+                return webbrowser.open(cmd)
+            path = self.registry.resolve(cmd)
+            if path:
+                proc = subprocess.Popen([path], close_fds=True)
+                with self._lock:
+                    self.processes = [p for p in self.processes if p.poll() is None]
+                    self.processes.append(proc)
+                return True
+            if hasattr(os, "startfile"):
+                # Нет в PATH — ShellExecute найдёт chrome/msedge по «App Paths», как делал start
+                os.startfile(cmd)
+                return True
+            return False
+
+    def submit(self, cmd: str, on_done: OnDone | None = None) -> Future:
+        """Запускает команду в фоне. Future[bool]; on_done(cmd, ok) вызывается из рабочего потока."""
+
+        def job() -> bool:
+            try:
+                ok = self._launch(cmd)
+            except Exception:
+                ok = False
+            if not ok:
+                metrics.inc("action_failures")
+            if on_done is not None:
+                on_done(cmd, ok)
+            return ok
+
+        return self._pool.submit(job)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+_executor: ActionExecutor | None = None
+_executor_lock = threading.Lock()
+
 
-def open_app(name: str) -> bool:
+def get_executor() -> ActionExecutor:
+    """Общий исполнитель действий (создаётся при первом обращении)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ActionExecutor()
+        return _executor
+
+
+def warm_up() -> list[str]:
     """
-    Открывает приложение по имени.
-    name — как пользователь назвал (например, "блокнот", "калькулятор").
-    Возвращает True, если команда запущена.
+    Вызывается при старте: находит пути ко всем приложениям из config.APPS.
+    Возвращает псевдонимы, для которых программа не найдена (о них лучше сказать сразу).
     """
+    return get_executor().registry.load()
+
+
+def _find_app(name: str) -> str | None:
     name = name.strip().lower()
     # Прямое совпадение
     if name in APPS:
-        cmd = APPS[name]
-        return _run(cmd)
+        return APPS[name]
     # Ищем по частичному совпадению (на случай "открой блокнот" -> name может быть "блокнот")
     for key, exe in APPS.items():
         if key in name or name in key:
-            return _run(exe)
-    return False
+            return exe
+    return None
 
 
-def _run(cmd: str) -> bool:
+@metrics.timed("action")
+def open_app(name: str, on_done: OnDone | None = None) -> bool:
+    """
+    Открывает приложение по имени.
+    name — как пользователь назвал (например, "блокнот", "калькулятор").
+    Возвращает True, если команда найдена и поставлена на запуск; сам запуск идёт
+    в фоне, его итог приходит в on_done(cmd, ok).
+    """
+    cmd = _find_app(name)
     if not cmd:
         return False
-    try:
-        # Для ms-settings:, URL и браузеров — start, чтобы Windows нашёл программу
-        if cmd.startswith("ms-") or "://" in cmd or cmd in ("chrome", "msedge", "firefox"):
-            subprocess.Popen(f"start {cmd}", shell=True)
-        else:
-            subprocess.Popen(cmd, shell=True)
-        return True
-    except Exception:
+    ex = get_executor()
+    # Без os.startfile (не Windows) запускать ненайденную программу нечем — отвечаем сразу
+    if not is_uri(cmd) and not hasattr(os, "startfile") and ex.registry.resolve(cmd) is None:
         return False
+    ex.submit(cmd, on_done)
+    return True
 
 
-def search_in_browser(query: str) -> bool:
-    """Открывает в браузере по умолчанию страницу поиска с запросом."""
+@metrics.timed("action")
+def search_in_browser(query: str, on_done: OnDone | None = None) -> bool:
+    """Открывает в браузере по умолчанию страницу поиска с запросом (в фоне)."""
     if not query or not query.strip():
         return False
     url = SEARCH_URL.format(query=urllib.parse.quote_plus(query.strip()))
-    try:
-        subprocess.Popen(f"start {url}", shell=True)
-        return True
-    except Exception:
-        return False
+    get_executor().submit(url, on_done)
+    return True
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Офлайн-прогон расшифровок через assistant.process — для пересчёта после
+изменений модели или intents.json.
+
+Вход: JSONL (поля text, необязательно session и id) или обычный текст
+(одна фраза в строке, каждая строка — отдельная сессия; цепочка last_intent
+и история LLM — только для сессий из JSONL). Действия pc_controller
+(открыть приложение, поиск) не выполняются, а только записываются.
+Нейросеть классифицирует все фразы пачками заранее; сессии идут параллельно
+в ограниченном пуле (внутри сессии — по порядку, с цепочкой last_intent
+и своей историей LLM), так что запросы к LLM разных сессий идут одновременно.
+
+Запуск:
+    python replay.py transcripts.jsonl --out replayed.jsonl
+    python replay.py phrases.txt --no-llm
+    python replay.py transcripts.jsonl --no-chain --workers 8   — каждая фраза отдельно
+На выходе JSONL: id, session, text, tag, reply, exit, actions, timings_ms.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import argparse
+import contextlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import assistant
+import metrics
+from llm_client import Conversation
+from neural.intents_model import IntentPredictor
+
+_local = threading.local()
+
+
+def read_utterances(path: str) -> list[dict]:
+    """Строки файла -> [{id, session, text}]. JSONL распознаётся по расширению .jsonl/.json."""
+    items = []
+    is_json = Path(path).suffix.lower() in (".jsonl", ".json")
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            if is_json:
+                rec = json.loads(line)
+                text = rec.get("text") or rec.get("utterance") or ""
+                items.append({"id": rec.get("id", n), "session": str(rec.get("session", "default")), "text": text})
+            else:
+                # Связи между строками текста не известны — каждая сама по себе (и параллельно)
+                items.append({"id": n, "session": str(n), "text": line})
+    return items
+
+
+def _record_action(kind: str):
+    def stub(arg: str, on_done=None) -> bool:
+        actions = getattr(_local, "actions", None)
+        if actions is not None:
+            actions.append({"action": kind, "arg": arg})
+        return True
+
+    return stub
+
+
+@contextlib.contextmanager
+def stub_actions():
+    """Подменяет действия с ПК в assistant на запись в список текущего хода."""
+    saved = assistant.open_app, assistant.search_in_browser
+    assistant.open_app = _record_action("open_app")
+    assistant.search_in_browser = _record_action("search")
+    try:
+        yield
+    finally:
+        assistant.open_app, assistant.search_in_browser = saved
+
+
+class PrecomputedPredictor:
+    """
+    Отдаёт теги, заранее посчитанные пачками; незнакомые фразы — в настоящий предсказатель.
+    Время пачек (без загрузки модели) делится поровну между фразами: predict() записывает
+    эту долю как этап classification_batch. Он посчитан заранее и в turn не входит.
+    """
+
+    def __init__(self, predictor: IntentPredictor, texts: list[str], batch_size: int = 256):
+        self.predictor = predictor
+        self.tags: dict[str, str] = {}
+        unique = list(dict.fromkeys(texts))
+        predictor._ensure_loaded()  # холодная загрузка модели — не время классификации
+        t0 = time.perf_counter()
+        for i in range(0, len(unique), batch_size):
+            batch = unique[i : i + batch_size]
+            self.tags.update(zip(batch, predictor.predict_batch(batch)))
+        self.batch_ms = (time.perf_counter() - t0) * 1000
+        self.per_text_ms = self.batch_ms / len(unique) if unique else 0.0
+
+    def predict(self, text: str) -> str:
+        tag = self.tags.get(text)
+        if tag is None:
+            return self.predictor.predict(text)
+        metrics.observe("classification_batch", self.per_text_ms)
+        return tag
+
+
+def run_session(turns: list[tuple[int, dict]], predictor, chain: bool = True) -> list[tuple[int, dict]]:
+    """Фразы одной сессии по порядку: last_intent и история LLM переходят от хода к ходу."""
+    conversation = Conversation(assistant.SYSTEM_PROMPT)
+    last_intent = None
+    out = []
+    for pos, turn in turns:
+        _local.actions = []
+        with metrics.trace() as timings:
+            reply, should_exit, tag = assistant.process(turn["text"], predictor, last_intent, conversation)
+        result = {
+            **turn,
+            "tag": tag,
+            "reply": reply,
+            "exit": should_exit,
+            "actions": _local.actions,
+            "timings_ms": {k: round(v, 3) for k, v in timings.items()},
+        }
+        out.append((pos, result))
+        if chain:
+            last_intent = tag
+    _local.actions = None
+    return out
+
+
+def replay(
+    items: list[dict],
+    workers: int = 4,
+    chain: bool = True,
+    batch_size: int = 256,
+    predictor: PrecomputedPredictor | None = None,
+) -> list[dict]:
+    """Прогоняет фразы и возвращает результаты в исходном порядке."""
+    if predictor is None:
+        predictor = PrecomputedPredictor(IntentPredictor(), [i["text"] for i in items], batch_size)
+    if chain:
+        sessions: dict[str, list] = {}
+        for pos, item in enumerate(items):
+            sessions.setdefault(item["session"], []).append((pos, item))
+        groups = list(sessions.values())
+    else:
+        groups = [[(pos, item)] for pos, item in enumerate(items)]
+
+    results: list[dict | None] = [None] * len(items)
+    with stub_actions(), ThreadPoolExecutor(max_workers=workers) as pool:
+        for group in pool.map(lambda g: run_session(g, predictor, chain), groups):
+            for pos, result in group:
+                results[pos] = result
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Прогон расшифровок через assistant.process")
+    ap.add_argument("input", help="JSONL (text, session, id) или текст — фраза в строке")
+    ap.add_argument("--out", default="-", help="куда писать JSONL (по умолчанию stdout)")
+    ap.add_argument("--workers", type=int, default=4, help="сколько сессий (и запросов к LLM) идёт одновременно")
+    ap.add_argument("--batch-size", type=int, default=256, help="размер пачки для нейросети")
+    ap.add_argument("--no-llm", action="store_true", help="только шаблонные ответы")
+    ap.add_argument("--no-chain", action="store_true", help="каждая фраза сама по себе (без last_intent и истории)")
+    ap.add_argument("--log-replies", action="store_true", help="дописывать ответы LLM в журнал для банка ответов")
+    args = ap.parse_args()
+
+    if args.no_llm:
+        assistant.LLM_ENABLED = False
+    assistant.REPLY_LOG_ENABLED = args.log_replies
+    metrics.enable()  # в памяти — для timings_ms и итоговой сводки
+
+    items = read_utterances(args.input)
+    t0 = time.perf_counter()
+    predictor = PrecomputedPredictor(IntentPredictor(), [i["text"] for i in items], args.batch_size)
+    results = replay(items, workers=args.workers, chain=not args.no_chain, predictor=predictor)
+    elapsed = time.perf_counter() - t0
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        for r in results:
+            out.write(json.dumps(r, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    durations: dict[str, list[float]] = {}
+    for r in results:
+        for stage, ms in r["timings_ms"].items():
+            durations.setdefault(stage, []).append(ms)
+    print(f"Фраз: {len(results)} за {elapsed:.1f} с", file=sys.stderr)
+    print(
+        f"Классификация пачками: {len(predictor.tags)} уникальных фраз за {predictor.batch_ms:.1f} мс "
+        f"(≈{predictor.per_text_ms:.3f} мс на фразу — в timings_ms как classification_batch, вне turn)",
+        file=sys.stderr,
+    )
+    if durations:
+        print(metrics.format_summary(durations), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
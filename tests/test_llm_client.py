@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+LLMClient против локальной заглушки Ollama: таймаут, keep_alive, история.
+Запуск: python -m pytest tests
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pytest
+
+pytest.importorskip("ollama")
+
+from llm_client import Conversation, LLMClient
+from ollama_stub import STUB_REPLY, OllamaStub
+
+
+def test_timeout_returns_none():
+    with OllamaStub(delay=2.0) as stub:
+        client = LLMClient(host=stub.url, timeout=0.3)
+        t0 = time.perf_counter()
+        reply = client.chat([{"role": "user", "content": "привет"}])
+        elapsed = time.perf_counter() - t0
+    assert reply is None  # assistant в этом случае отвечает шаблоном
+    assert elapsed < 1.5
+    assert not client.warm.is_set()
+
+
+def test_keep_alive_sent_with_every_request():
+    with OllamaStub() as stub:
+        client = LLMClient(host=stub.url, timeout=5, keep_alive="15m")
+        assert client.warm_up()
+        assert client.chat([{"role": "user", "content": "привет"}]) == STUB_REPLY
+        assert client.chat([{"role": "user", "content": "привет"}], on_partial=lambda p: None) == STUB_REPLY
+    assert [r["path"] for r in stub.requests] == ["/api/generate", "/api/chat", "/api/chat"]
+    assert all(r["body"]["keep_alive"] == "15m" for r in stub.requests)
+
+
+def test_history_grows_with_unchanged_prefix():
+    conv = Conversation("системный промпт", max_tokens=10_000)
+    with OllamaStub() as stub:
+        client = LLMClient(host=stub.url, timeout=5)
+        for text in ("первый", "второй", "третий"):
+            reply = client.chat(conv.messages(text))
+            conv.add_turn(text, reply)
+    sent = [r["body"]["messages"] for r in stub.requests]
+    assert [len(m) for m in sent] == [2, 4, 6]
+    # Каждый запрос начинается ровно с предыдущего (префикс для кэша Ollama)
+    for prev, cur in zip(sent, sent[1:]):
+        assert cur[: len(prev)] == prev
+    assert sent[-1][-2] == {"role": "assistant", "content": STUB_REPLY}
+
+
+def test_concurrent_turns_keep_history_in_order():
+    import threading
+
+    import assistant
+    import llm_client
+
+    conv = Conversation("системный промпт", max_tokens=10_000)
+    with OllamaStub(delay=0.1) as stub:
+        llm_client.set_client(LLMClient(host=stub.url, timeout=5))
+        try:
+            threads = [threading.Thread(target=assistant._llm_reply, args=(t, "поболтать", conv)) for t in ("раз", "два")]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            llm_client.set_client(None)
+    first, second = (r["body"]["messages"] for r in stub.requests)
+    assert second[: len(first)] == first
+    assert [m["role"] for m in conv.history] == ["user", "assistant", "user", "assistant"]
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Кэш озвучки: заранее синтезированные WAV для шаблонных ответов.
+
+Ключ — текст + голос, скорость и громкость (VOICE_INDEX, SPEECH_RATE, VOLUME),
+так что смена настроек голоса не проигрывает старые записи.
+- Статические ответы из data/intents.json (без %time%, %app% и т.п.) рендерятся
+  в фоне при первом запуске (prerender_async) или вручную: python tts_cache.py
+- Короткие фразы с повторяющимися подстановками («Открываю блокнот», см.
+  assistant.CACHED_SPEECH_TAGS) кэшируются после первого произнесения; их не
+  больше TTS_CACHE_DYNAMIC_MAX, лишние вытесняются (LRU).
+Попадание в кэш проигрывается прямо из отображённого в память файла (mmap),
+без повторного синтеза.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from config import (
+    INTENTS_FILE,
+    SPEECH_RATE,
+    TTS_CACHE_DIR,
+    TTS_CACHE_DYNAMIC_MAX,
+    TTS_CACHE_MAX_CHARS,
+    VOICE_INDEX,
+    VOLUME,
+)
+
+STATIC_DIR = "static"
+DYNAMIC_DIR = "dynamic"
+
+
+def cache_key(text: str) -> str:
+    raw = f"{text.strip()}|{VOICE_INDEX}|{SPEECH_RATE}|{VOLUME}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _wav_data_offset(mm) -> tuple[int, int, int, int, int]:
+    """Разбирает RIFF: (смещение данных, длина, частота, каналы, байт на сэмпл)."""
+    if mm[:4] != b"RIFF" or mm[8:12] != b"WAVE":
+        raise ValueError("не WAV")
+    pos, fmt = 12, None
+    while pos + 8 <= len(mm):
+        cid, size = mm[pos : pos + 4], struct.unpack("<I", mm[pos + 4 : pos + 8])[0]
+        body = pos + 8
+        if cid == b"fmt ":
+            _, channels, rate, _, _, bits = struct.unpack("<HHIIHH", mm[body : body + 16])
+            fmt = (rate, channels, bits // 8)
+        elif cid == b"data" and fmt:
+            size = min(size, len(mm) - body)
+            return (body, size, *fmt)
+        pos = body + size + (size & 1)
+    raise ValueError("в WAV нет данных")
+
+
+class _Clip:
+    """WAV, отображённый в память; samples — массив numpy поверх mmap без копирования."""
+
+    def __init__(self, path: Path):
+        import numpy as np
+
+        self._f = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+            offset, size, self.rate, channels, width = _wav_data_offset(self._mm)
+            if width != 2:
+                raise ValueError("ожидается 16-битный WAV")
+            self.samples = np.frombuffer(self._mm, dtype=np.int16, count=size // 2, offset=offset).reshape(-1, channels)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        self.samples = None
+        if getattr(self, "_mm", None) is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # ещё играет — закроется сборщиком мусора
+            self._mm = None
+        self._f.close()
+
+
+class TTSCache:
+    """Файлы WAV на диске + открытые клипы в памяти."""
+
+    def __init__(self, root: str = TTS_CACHE_DIR, dynamic_max: int = TTS_CACHE_DYNAMIC_MAX):
+        self.root = Path(root)
+        self.dynamic_max = dynamic_max
+        self._lock = threading.Lock()
+        self._clips: dict[str, _Clip] = {}
+        self._dynamic: OrderedDict[str, Path] = OrderedDict()
+        self._pending: set[str] = set()
+        self._scan_dynamic()
+
+    def _scan_dynamic(self) -> None:
+        d = self.root / DYNAMIC_DIR
+        if not d.exists():
+            return
+        files = sorted(d.glob("*.wav"), key=lambda p: p.stat().st_mtime)
+        for p in files:
+            self._dynamic[p.stem] = p
+
+    def _path(self, key: str) -> Path | None:
+        static = self.root / STATIC_DIR / f"{key}.wav"
+        if static.exists():
+            return static
+        with self._lock:
+            p = self._dynamic.get(key)
+            if p is not None:
+                self._dynamic.move_to_end(key)
+        if p is not None:
+            try:
+                os.utime(p)  # порядок LRU переживает перезапуск
+            except OSError:
+                return None
+        return p
+
+    def _clip(self, text: str) -> _Clip | None:
+        key = cache_key(text)
+        with self._lock:
+            clip = self._clips.get(key)
+        if clip is not None:
+            return clip
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            clip = _Clip(path)
+        except Exception:
+            return None
+        with self._lock:
+            self._clips[key] = clip
+        return clip
+
+    def play(self, text: str, block: bool = True) -> bool:
+        """Проигрывает фразу из кэша. False — фразы нет в кэше (нужен живой синтез)."""
+        clip = self._clip(text)
+        if clip is None:
+            return False
+        try:
+            import sounddevice as sd
+
+            sd.play(clip.samples, clip.rate)
+            if block:
+                sd.wait()
+        except Exception:
+            return False
+        return True
+
+    def render(self, text: str, dynamic: bool = False) -> Path | None:
+        """Синтезирует фразу в WAV (под общей блокировкой движка pyttsx3)."""
+        from voice_output import ENGINE_LOCK, get_engine
+
+        key = cache_key(text)
+        target = self.root / (DYNAMIC_DIR if dynamic else STATIC_DIR) / f"{key}.wav"
+        if target.exists():
+            return target
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(".tmp.wav")
+        try:
+            with ENGINE_LOCK:
+                engine = get_engine()
+                engine.save_to_file(text, str(tmp))
+                engine.runAndWait()
+            os.replace(tmp, target)
+        except Exception:
+            tmp.unlink(missing_ok=True)
+            return None
+        if dynamic:
+            self._add_dynamic(key, target)
+        return target
+
+    def _add_dynamic(self, key: str, path: Path) -> None:
+        evicted = []
+        with self._lock:
+            self._dynamic[key] = path
+            self._dynamic.move_to_end(key)
+            while len(self._dynamic) > self.dynamic_max:
+                old_key, old_path = self._dynamic.popitem(last=False)
+                evicted.append((self._clips.pop(old_key, None), old_path))
+        for clip, old_path in evicted:
+            if clip is not None:
+                clip.close()
+            try:
+                old_path.unlink(missing_ok=True)
+            except OSError:
+                pass  # Windows: файл ещё отображён — удалится при следующем вытеснении
+
+    def remember(self, text: str) -> None:
+        """После живого синтеза: короткую фразу в фоне сохранить в динамический кэш."""
+        text = text.strip()
+        if not text or len(text) > TTS_CACHE_MAX_CHARS:
+            return
+        key = cache_key(text)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+
+        def job():
+            try:
+                self.render(text, dynamic=True)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+        threading.Thread(target=job, daemon=True, name="vegra-tts-cache").start()
+
+    def prerender(self, texts) -> int:
+        """Рендерит недостающие статические фразы. Возвращает число новых файлов."""
+        n = 0
+        for text in texts:
+            if (self.root / STATIC_DIR / f"{cache_key(text)}.wav").exists():
+                continue
+            if self.render(text) is not None:
+                n += 1
+        return n
+
+
+def static_responses(path: str = INTENTS_FILE) -> list[str]:
+    """Ответы из intents.json без подстановок (%time%, %app% …) — их можно озвучить заранее."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    seen = dict.fromkeys(r.strip() for i in data["intents"] for r in i.get("responses", []) if "%" not in r)
+    return [t for t in seen if t]
+
+
+_cache: TTSCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> TTSCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTSCache()
+        return _cache
+
+
+def prerender_async() -> threading.Thread:
+    """При старте: в фоне дорендерить статические ответы, которых ещё нет в кэше."""
+    t = threading.Thread(target=lambda: get_cache().prerender(static_responses()), daemon=True, name="vegra-tts-prerender")
+    t.start()
+    return t
+
+
+if __name__ == "__main__":
+    texts = static_responses()
+    print(f"Статических ответов: {len(texts)}")
+    print(f"Озвучено новых: {get_cache().prerender(texts)} -> {Path(TTS_CACHE_DIR) / STATIC_DIR}")
@@ -2,14 +2,85 @@
 """
 Голосовой ввод: микрофон -> текст (Speech-to-Text).
 Используется sounddevice (вместо PyAudio) — проще ставить на Windows.
+
+Запись идёт в заранее выделенные буферы NumPy (кольцо из нескольких штук),
+тишина в начале и конце обрезается векторно, а распознавателю уходит
+memoryview на нужный кусок буфера — без flatten()/tobytes() и лишних копий.
 """
 
+import threading
+
+import numpy as np
 import speech_recognition as sr
 import sounddevice as sd
 
+import metrics
 from config import LANGUAGE
 
 SAMPLE_RATE = 16000
+MAX_SECONDS = 15
+
+# Обрезка тишины: кадры по 20 мс, кадр «тихий», если пик ниже порога.
+# Порог считается по самой записи: в TRIM_NOISE_RATIO раз выше фона (пики самых
+# тихих кадров), но не выше половины пика записи — тихая речь тоже проходит.
+TRIM_FRAME = SAMPLE_RATE // 50
+TRIM_NOISE_PERCENTILE = 10
+TRIM_NOISE_RATIO = 3
+TRIM_MIN_THRESHOLD = 30       # из 32767 (int16): ниже — только шум АЦП
+TRIM_PAD = SAMPLE_RATE // 5   # оставить 200 мс вокруг речи
+# Тихую запись поднимаем до этого пика (на месте, в том же буфере)
+NORMALIZE_PEAK = 20000
+
+
+class AudioRing:
+    """Кольцо предвыделенных буферов int16: новая запись не выделяет память."""
+
+    def __init__(self, slots: int = 2, max_frames: int = MAX_SECONDS * SAMPLE_RATE):
+        self._buffers = [np.zeros((max_frames, 1), dtype=np.int16) for _ in range(slots)]
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, frames: int) -> np.ndarray:
+        """Следующий буфер кольца, срез на frames кадров (view, не копия)."""
+        with self._lock:
+            buf = self._buffers[self._next]
+            self._next = (self._next + 1) % len(self._buffers)
+        return buf[:frames]
+
+
+_ring = AudioRing()
+_recognizer = sr.Recognizer()
+
+
+def trim_silence(samples: np.ndarray) -> np.ndarray:
+    """
+    Обрезает тишину по краям. samples — одномерный int16; возвращает view.
+    Пустой срез — только если запись совсем беззвучная (одни нули).
+    """
+    n = len(samples) // TRIM_FRAME
+    if n == 0:
+        return samples
+    frames = samples[: n * TRIM_FRAME].reshape(n, TRIM_FRAME)
+    # Пик |x| кадра в int32: у -32768 в int16 нет пары
+    peaks = np.maximum(frames.max(axis=1).astype(np.int32), -frames.min(axis=1).astype(np.int32))
+    peak = int(peaks.max())
+    if peak == 0:
+        return samples[:0]
+    floor = float(np.percentile(peaks, TRIM_NOISE_PERCENTILE))
+    threshold = min(max(floor * TRIM_NOISE_RATIO, TRIM_MIN_THRESHOLD), peak // 2)
+    loud = np.flatnonzero(peaks > threshold)
+    start = max(0, loud[0] * TRIM_FRAME - TRIM_PAD)
+    end = min(len(samples), (loud[-1] + 1) * TRIM_FRAME + TRIM_PAD)
+    return samples[start:end]
+
+
+def normalize(samples: np.ndarray) -> None:
+    """Поднимает громкость тихой записи до NORMALIZE_PEAK — на месте, без новой памяти."""
+    if samples.size == 0:
+        return
+    peak = max(int(samples.max()), -int(samples.min()))
+    if 0 < peak < NORMALIZE_PEAK:
+        np.multiply(samples, NORMALIZE_PEAK / peak, out=samples, casting="unsafe")
 
 
 def listen(timeout: int = 5, phrase_time_limit: int = 10) -> str | None:
@@ -18,28 +89,33 @@ def listen(timeout: int = 5, phrase_time_limit: int = 10) -> str | None:
     Записывает до phrase_time_limit секунд (3–15), затем отправляет в Google.
     Возвращает None, если не удалось распознать или ошибка.
     """
-    duration = max(3, min(phrase_time_limit, 15))
+    duration = max(3, min(phrase_time_limit, MAX_SECONDS))
+    buf = _ring.acquire(int(duration * SAMPLE_RATE))
     try:
-        recording = sd.rec(
-            int(duration * SAMPLE_RATE),
-            samplerate=SAMPLE_RATE,
-            channels=1,
-            dtype="int16",
-        )
-        sd.wait()
+        with metrics.span("capture"):
+            sd.rec(out=buf, samplerate=SAMPLE_RATE, channels=1, dtype="int16")
+            sd.wait()
     except Exception:
+        metrics.inc("capture_failures")
         return None
 
-    raw = recording.flatten().tobytes()
-    audio = sr.AudioData(raw, SAMPLE_RATE, 2)
+    speech = trim_silence(buf[:, 0])
+    if speech.size == 0:
+        metrics.inc("asr_unrecognized")
+        return None
+    normalize(speech)
+    metrics.inc("asr_payload_bytes", speech.nbytes)
+    audio = sr.AudioData(memoryview(speech).cast("B"), SAMPLE_RATE, 2)
 
-    r = sr.Recognizer()
     try:
-        text = r.recognize_google(audio, language=LANGUAGE)
+        with metrics.span("asr"):
+            text = _recognizer.recognize_google(audio, language=LANGUAGE)
         return text.strip()
     except sr.UnknownValueError:
+        metrics.inc("asr_unrecognized")
         return None
     except sr.RequestError:
+        metrics.inc("asr_failures")
         return None
 
 
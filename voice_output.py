@@ -3,9 +3,16 @@
 Голосовой вывод: текст -> речь (Text-to-Speech)
 """
 
+import threading
+
 import pyttsx3
 
-from config import VOICE_INDEX, SPEECH_RATE, VOLUME
+import metrics
+import tts_cache
+from config import VOICE_INDEX, SPEECH_RATE, VOLUME, TTS_CACHE_ENABLED
+
+# pyttsx3 не потокобезопасен: живая речь и фоновый рендер кэша идут по очереди
+ENGINE_LOCK = threading.RLock()
 
 
 def get_engine():
@@ -19,18 +26,30 @@ def get_engine():
     return engine
 
 
-def speak(text: str, block: bool = True) -> None:
+@metrics.timed("tts")
+def speak(text: str, block: bool = True, remember: bool = False) -> None:
     """
     Озвучивает текст.
     block: если True — ждёт окончания речи, иначе говорит в фоне.
+    Готовые фразы играются из кэша озвучки (tts_cache), остальные синтезируются.
+    remember: после живого синтеза сохранить фразу в динамический кэш — только для
+    повторяющихся подстановок («Открываю блокнот»), не для времени или ответов LLM.
     """
     if not text or not text.strip():
         return
-    engine = get_engine()
-    engine.say(text)
-    if block:
-        engine.runAndWait()
-    else:
-        engine.startLoop(False)
-        engine.iterate()
-        engine.endLoop()
+    if TTS_CACHE_ENABLED:
+        if tts_cache.get_cache().play(text, block=block):
+            metrics.inc("tts_cache_hits")
+            return
+        metrics.inc("tts_cache_misses")
+    with ENGINE_LOCK:
+        engine = get_engine()
+        engine.say(text)
+        if block:
+            engine.runAndWait()
+        else:
+            engine.startLoop(False)
+            engine.iterate()
+            engine.endLoop()
+    if remember and TTS_CACHE_ENABLED:
+        tts_cache.get_cache().remember(text)